@@ -0,0 +1,129 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from snapshots import dated_snapshot_columns
+from status_analytics import PIPELINE_STAGES
+from status_matrix import StatusMatrix
+
+# A capacity that grows or shrinks by at least this factor between two
+# releases is flagged
+CAPACITY_JUMP_RATIO = 10.0
+
+REVIEW_COLUMNS = ['Region', 'Site Name', 'Technology Type', 'Anomaly', 'Snapshot', 'Previous Snapshot',
+                  'Previous Value', 'Value', 'Detail']
+
+def previous_observed(present):
+    # For every site x snapshot cell, the column of the site's latest earlier
+    # observation (-1 if there is none)
+    columns = np.where(present, np.arange(present.shape[1]), -1)
+    latest = np.maximum.accumulate(columns, axis=1)
+    previous = np.full(present.shape, -1)
+    previous[:, 1:] = latest[:, :-1]
+    return previous
+
+def capacity_jumps(capacities, ratio=CAPACITY_JUMP_RATIO):
+    # Compare each observed capacity with the site's previous observed one;
+    # zero and missing capacities are not compared
+    present = ~np.isnan(capacities) & (capacities > 0)
+    previous = previous_observed(present)
+    rows, columns = np.nonzero(present & (previous >= 0))
+    previous_columns = previous[rows, columns]
+    values = capacities[rows, columns]
+    previous_values = capacities[rows, previous_columns]
+    jump = (values >= previous_values * ratio) | (values * ratio <= previous_values)
+    # Capacities are stored as float32; round away the conversion noise
+    values, previous_values = values.astype(float).round(3), previous_values.astype(float).round(3)
+    return rows[jump], columns[jump], previous_columns[jump], previous_values[jump], values[jump]
+
+def status_regressions(codes, labels):
+    # A pipeline status that is earlier than the latest pipeline status seen
+    # before it, e.g. In Service followed by Publicly Announced
+    stage_of_label = np.array([PIPELINE_STAGES.index(label) if label in PIPELINE_STAGES else -1
+                               for label in labels] + [-1])
+    stages = stage_of_label[codes]  # code -1 (blank) indexes the trailing -1
+    present = stages >= 0
+    previous = previous_observed(present)
+    rows, columns = np.nonzero(present & (previous >= 0))
+    previous_columns = previous[rows, columns]
+    regression = stages[rows, columns] < stages[rows, previous_columns]
+    return rows[regression], columns[regression], previous_columns[regression]
+
+def intermittent_presence(codes):
+    # Sites that reappear after missing one or more releases
+    present = codes != -1
+    previous = previous_observed(present)
+    rows, columns = np.nonzero(present & (previous >= 0) & (previous < np.arange(codes.shape[1]) - 1))
+    previous_columns = previous[rows, columns]
+    return rows, columns, previous_columns, columns - previous_columns - 1
+
+def review_rows(sites, anomaly, rows, columns, previous_columns, previous_values, values, details, snapshots):
+    review = sites.iloc[rows][['Region', 'Site Name', 'Technology Type']].reset_index(drop=True)
+    review['Anomaly'] = anomaly
+    review['Snapshot'] = snapshots[columns]
+    review['Previous Snapshot'] = snapshots[previous_columns]
+    review['Previous Value'] = previous_values
+    review['Value'] = values
+    review['Detail'] = details
+    return review
+
+def find_anomalies(sites, codes, labels, dates, capacities=None, ratio=CAPACITY_JUMP_RATIO):
+    # sites: one row per site; codes: site x snapshot status codes (-1 where
+    # blank) with snapshots in date order; capacities: optional matrix of the
+    # same shape with each release's capacity (NaN where not reported)
+    snapshots = pd.DatetimeIndex(dates)
+    label_array = np.array(list(labels) + [None], dtype=object)
+    reviews = []
+
+    if capacities is not None:
+        rows, columns, previous_columns, previous_values, values = capacity_jumps(capacities, ratio)
+        details = [f"x{value / previous:.1f}" for previous, value in zip(previous_values, values)]
+        reviews.append(review_rows(sites, 'Capacity jump', rows, columns, previous_columns,
+                                   previous_values, values, details, snapshots))
+
+    rows, columns, previous_columns = status_regressions(codes, labels)
+    reviews.append(review_rows(sites, 'Status regression', rows, columns, previous_columns,
+                               label_array[codes[rows, previous_columns]], label_array[codes[rows, columns]],
+                               '', snapshots))
+
+    rows, columns, previous_columns, missed = intermittent_presence(codes)
+    details = [f"missing from {count} release{'s' if count > 1 else ''}" for count in missed]
+    reviews.append(review_rows(sites, 'Intermittent presence', rows, columns, previous_columns,
+                               None, label_array[codes[rows, columns]], details, snapshots))
+
+    review = pd.concat(reviews, ignore_index=True)[REVIEW_COLUMNS]
+    return review.sort_values(['Region', 'Site Name', 'Snapshot'], kind='stable').reset_index(drop=True)
+
+def anomalies_from_wide(df, ratio=CAPACITY_JUMP_RATIO):
+    # The normalised table only keeps the latest capacity, so only status
+    # anomalies can be found from it
+    columns, dates = dated_snapshot_columns(df)
+    matrix = StatusMatrix.from_frame(df, columns, dates)
+    return find_anomalies(matrix.sites, matrix.codes, matrix.labels, matrix.dates, None, ratio)
+
+def anomalies_from_site_master(db_path, ratio=CAPACITY_JUMP_RATIO):
+    # The site master keeps each release's capacity, so capacity jumps are
+    # checked as well
+    matrix = StatusMatrix.from_site_master(db_path)
+    return find_anomalies(matrix.sites, matrix.codes, matrix.labels, matrix.dates, matrix.capacities, ratio)
+
+def main(input_file, output_file, site_master_path=None, ratio=CAPACITY_JUMP_RATIO):
+    if site_master_path:
+        review = anomalies_from_site_master(site_master_path, ratio)
+    else:
+        review = anomalies_from_wide(pd.read_excel(input_file), ratio)
+
+    review.to_excel(output_file, index=False)
+    print(f"{len(review)} anomalies saved to '{output_file}' for review")
+    print(review['Anomaly'].value_counts().to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag capacity jumps, status regressions and sites that drop out")
+    parser.add_argument('--input', default='extracted_new.xlsx', help="Normalised output of preprocessing.py")
+    parser.add_argument('--site-master', help="SQLite site master; adds capacity jumps between releases")
+    parser.add_argument('--ratio', type=float, default=CAPACITY_JUMP_RATIO,
+                        help="Capacity change factor that counts as a jump")
+    parser.add_argument('--output', default='anomalies.xlsx')
+    args = parser.parse_args()
+    main(args.input, args.output, args.site_master, args.ratio)
@@ -0,0 +1,59 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from excel_export import write_excel
+
+STATUSES = ['In Service', 'Committed', 'Publicly Announced', 'Anticipated', '']
+TECHNOLOGIES = ['Solar PV', 'Wind', 'Coal', 'Gas', 'Hydro', 'Battery Storage']
+
+def build_wide_frame(sites, snapshots, seed=0):
+    rng = random.Random(seed)
+    data = {
+        'Region': [rng.choice(['NSW1', 'QLD1', 'SA1', 'TAS1', 'VIC1']) for _ in range(sites)],
+        'Site Name': [f"Site {i}" for i in range(sites)],
+        'Technology Type': [rng.choice(TECHNOLOGIES) for _ in range(sites)],
+        'Nameplate Capacity': [round(rng.uniform(1, 800), 1) for _ in range(sites)]
+    }
+    for snapshot in range(snapshots):
+        data[f"Snapshot {snapshot}"] = [rng.choice(STATUSES) for _ in range(sites)]
+    return pd.DataFrame(data)
+
+def measure(label, write):
+    # Time and memory are measured in separate runs, as tracemalloc slows
+    # allocation-heavy code down considerably
+    start = time.perf_counter()
+    write()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    write()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<28} {elapsed:8.2f} s {peak / 2**20:10.1f} MiB peak")
+    return elapsed
+
+def main(sites, snapshots):
+    df = build_wide_frame(sites, snapshots)
+    print(f"Writing {df.shape[0]} rows x {df.shape[1]} columns")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pandas_file = os.path.join(temp_dir, 'pandas.xlsx')
+        streaming_file = os.path.join(temp_dir, 'streaming.xlsx')
+        pandas_time = measure("pandas to_excel (openpyxl)", lambda: df.to_excel(pandas_file, index=False))
+        streaming_time = measure("streaming write_excel", lambda: write_excel(df, streaming_file))
+
+    print(f"Speedup: {pandas_time / streaming_time:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the streaming Excel writer with pandas to_excel")
+    parser.add_argument('--sites', type=int, default=5000)
+    parser.add_argument('--snapshots', type=int, default=100)
+    args = parser.parse_args()
+    main(args.sites, args.snapshots)
@@ -1,6 +1,8 @@
 import pandas as pd
 import re
 
+from sections import assign_sections, site_name_series
+
 # File path
 file_path = 'Generation_Information_QLD_20150731.xlsx'
 
@@ -29,6 +31,7 @@ def process_sheet(df, region, sheet_type):
     print(df.head())
 
     rows_to_keep = []
+    sections, is_marker = assign_sections(site_name_series(df), 'In Service')
 
     for index, row in df.iterrows():
         site_name = row.get('Power Station') or row.get('Project', '')
@@ -43,9 +46,9 @@ def process_sheet(df, region, sheet_type):
         if sheet_type == 'new_developments':
             new_row['Unit Status'] = row.get('Unit Status', 'Unknown')
         elif sheet_type == 'scheduled':
-            if site_name == 'Committed':
-                continue  # Skip the 'Committed' row itself
-            new_row['Unit Status'] = 'Committed' if 'Committed' in df.iloc[:index+1]['Power Station'].values else 'In Service'
+            if is_marker[index]:
+                continue  # Skip the section marker rows themselves
+            new_row['Unit Status'] = sections[index]
         else:  # non-scheduled
             new_row['Unit Status'] = 'In Service'
         
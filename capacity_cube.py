@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from snapshots import NON_DATE_COLUMNS, snapshot_columns, snapshot_dates, to_long
+
+CUBE_DIMENSIONS = ['Region', 'Technology Type', 'Status', 'Snapshot']
+
+def build_cube(df, columns=None):
+    # Capacity and site-count totals for every region x technology x status x
+    # snapshot combination, from a single melt and groupby over the wide table.
+    # Capacities are the sites' nameplate capacities in the merged table.
+    long_df = to_long(df, columns)
+    long_df['Capacity'] = pd.to_numeric(long_df['Nameplate Capacity'], errors='coerce')
+
+    cube = (long_df.groupby(CUBE_DIMENSIONS, dropna=False, sort=False)
+            .agg(Capacity=('Capacity', 'sum'), Sites=('Site Name', 'count'))
+            .reset_index())
+    cube['Snapshot Date'] = snapshot_dates(cube['Snapshot'])
+    return cube.sort_values(['Snapshot Date'] + CUBE_DIMENSIONS[:3], kind='stable').reset_index(drop=True)
+
+def update_cube(cube, df, snapshot):
+    # Recompute only the slice of the cube for a newly merged snapshot
+    snapshot_slice = build_cube(df[[column for column in NON_DATE_COLUMNS if column in df.columns] + [snapshot]])
+    cube = pd.concat([cube[cube['Snapshot'] != snapshot], snapshot_slice], ignore_index=True)
+    return cube.sort_values(['Snapshot Date'] + CUBE_DIMENSIONS[:3], kind='stable').reset_index(drop=True)
+
+def slice_fingerprints(df):
+    # Sorted hashes of the rows listed in each snapshot; a snapshot with the
+    # same fingerprint in two versions of the table has the same cube slice
+    fingerprints = {}
+    site_columns = [column for column in NON_DATE_COLUMNS if column in df.columns]
+    for snapshot in snapshot_columns(df):
+        rows = df[site_columns + [snapshot]]
+        rows = rows[rows[snapshot].notna() & (rows[snapshot] != '')]
+        fingerprints[snapshot] = np.sort(pd.util.hash_pandas_object(rows, index=False).to_numpy())
+    return fingerprints
+
+def refresh_cube(cube, previous_df, df):
+    # Bring a cube built from previous_df up to date with df by recomputing
+    # only the snapshots that are new or whose sites changed, e.g. a release
+    # that updated some capacities; snapshots no longer in df are dropped
+    previous = slice_fingerprints(previous_df)
+    current = slice_fingerprints(df)
+    cube = cube[cube['Snapshot'].isin(list(current))]
+    for snapshot, fingerprint in current.items():
+        if snapshot not in previous or not np.array_equal(previous[snapshot], fingerprint):
+            cube = update_cube(cube, df, snapshot)
+    return cube.reset_index(drop=True)
+
+def capacity_series(cube, region=None, technology=None, status=None):
+    # e.g. capacity_series(cube, 'QLD1', 'Solar PV', 'Committed') gives committed
+    # solar capacity in QLD1 for every snapshot
+    mask = pd.Series(True, index=cube.index)
+    for column, value in [('Region', region), ('Technology Type', technology), ('Status', status)]:
+        if value is not None:
+            mask &= cube[column] == value
+    return cube[mask].groupby('Snapshot Date')[['Capacity', 'Sites']].sum()
+
+def cube_path(site_table_path):
+    root, _ = os.path.splitext(site_table_path)
+    return f"{root}_cube.pkl"
+
+def save_cube(cube, site_table_path):
+    output_file = cube_path(site_table_path)
+    cube.to_pickle(output_file)
+    return output_file
+
+def load_cube(site_table_path):
+    return pd.read_pickle(cube_path(site_table_path))
@@ -0,0 +1,41 @@
+import os
+import pickle
+
+CHECKPOINT_FILE = 'merge_checkpoint.pkl'
+
+# Number of merged workbooks between two checkpoints
+CHECKPOINT_INTERVAL = 10
+
+def save_checkpoint(checkpoint_path, combined_df, completed):
+    # Write to a temporary file first so a crash mid-write never leaves a
+    # truncated checkpoint behind
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump({'combined_df': combined_df, 'completed': list(completed)}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, checkpoint_path)
+
+def load_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'rb') as f:
+        checkpoint = pickle.load(f)
+    return checkpoint['combined_df'], checkpoint['completed']
+
+def partition_checkpoint_path(checkpoint_path, partition):
+    root, ext = os.path.splitext(checkpoint_path)
+    return f"{root}_{partition}{ext}"
+
+def save_extracted(checkpoint_path, extracted):
+    # Extracted rows per workbook path, for stages that replay their merge
+    # on top of a freshly built frame instead of resuming a merged one
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump({'extracted': dict(extracted)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, checkpoint_path)
+
+def load_extracted(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return {}
+    with open(checkpoint_path, 'rb') as f:
+        return pickle.load(f)['extracted']
@@ -1,66 +1,53 @@
-import pandas as pd
-from dateutil import parser
+import argparse
 from datetime import datetime
 
-def normalize_date(date_str):
-    try:
-        # Handle the specific case of "2 22 February 2022"
-        if '22 February 2022' in date_str:
-            return datetime(2022, 2, 22)
-        
-        # Handle month and year format
-        if len(date_str.split()) == 2:
-            try:
-                return datetime.strptime(date_str, "%B %Y").replace(day=1)
-            except ValueError:
-                pass  # If it's not a month name, continue to other parsing methods
-        
-        # Handle other date formats
-        date = parser.parse(date_str, dayfirst=False, yearfirst=False)
-        
-        # If day is not specified, set it to 1
-        if date.day == 1 and len(date_str.split()) == 2:
-            return date.replace(day=1)
-        
-        return date
-    except:
-        print(f"Warning: Unable to parse date '{date_str}'")
-        return None
+from preprocessing import normalize_date
 
-# Read the Excel file
-df = pd.read_excel('extracted2.xlsx')
+def main(input_file='extracted2.xlsx', output_file='extracted_new.xlsx'):
+    import pandas as pd
 
-# List of date columns (excluding 'Region', 'Site Name', 'Technology Type', and 'Nameplate Capacity')
-non_date_columns = ['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity']
-date_columns = [col for col in df.columns if col not in non_date_columns]
+    # Read the Excel file
+    df = pd.read_excel(input_file)
 
-# Dictionary to store new column names and their corresponding dates
-new_column_names = {}
-column_dates = {}
+    # List of date columns (excluding 'Region', 'Site Name', 'Technology Type', and 'Nameplate Capacity')
+    non_date_columns = ['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity']
+    date_columns = [col for col in df.columns if col not in non_date_columns]
 
-# Normalize dates in column names
-for col in date_columns:
-    date = normalize_date(col)
-    if date:
-        new_name = date.strftime('%d-%m-%Y')
-        new_column_names[col] = new_name
-        column_dates[new_name] = date
-    else:
-        new_column_names[col] = col
-        column_dates[col] = datetime.max
-    print(f"Original: {col}, Normalized: {new_column_names[col]}")
+    # Dictionary to store new column names and their corresponding dates
+    new_column_names = {}
+    column_dates = {}
 
-# Rename the columns
-df = df.rename(columns=new_column_names)
+    # Normalize dates in column names
+    for col in date_columns:
+        date = normalize_date(col)
+        if date:
+            new_name = date.strftime('%d-%m-%Y')
+            new_column_names[col] = new_name
+            column_dates[new_name] = date
+        else:
+            new_column_names[col] = col
+            column_dates[col] = datetime.max
+        print(f"Original: {col}, Normalized: {new_column_names[col]}")
 
-# Sort date columns
-sorted_date_columns = sorted(new_column_names.values(), key=lambda x: column_dates[x])
+    # Rename the columns
+    df = df.rename(columns=new_column_names)
 
-# Reorder columns
-final_column_order = non_date_columns + sorted_date_columns
-df = df[final_column_order]
+    # Sort date columns
+    sorted_date_columns = sorted(new_column_names.values(), key=lambda x: column_dates[x])
 
-# Write the result to a new Excel file
-df.to_excel('extracted_new.xlsx', index=False)
+    # Reorder columns
+    final_column_order = non_date_columns + sorted_date_columns
+    df = df[final_column_order]
 
-print("Date normalization and sorting completed. Output saved to 'extracted_new.xlsx'.")
+    # Write the result to a new Excel file
+    df.to_excel(output_file, index=False)
+
+    print(f"Date normalization and sorting completed. Output saved to '{output_file}'.")
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalise and sort the snapshot date columns")
+    parser.add_argument('--input', default='extracted2.xlsx')
+    parser.add_argument('--output', default='extracted_new.xlsx')
+    args = parser.parse_args()
+    main(args.input, args.output)
@@ -0,0 +1,315 @@
+import argparse
+import contextlib
+import io
+import math
+import numbers
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+import reference_pipeline
+from extractors import (CATEGORY_SHEET_NAMES, SINGLE_SHEET_NAME, detect_layout, extract_region, extract_single_sheet,
+                        find_sheet_name, process_file, process_sheet, read_sheet)
+from full_automation_algo import (empty_combined_frame, list_workbook_files, merge_data, merge_region_partitions,
+                                  merge_workbooks)
+from sections import SECTION_MARKERS
+from site_records import RECORD_COLUMNS, records_from_frame
+from spill_merge import merged_sites, spill_workbooks
+
+# Runs the original row-by-row extraction and merge (reference_pipeline.py)
+# next to the optimised paths used by full_automation_algo, on synthetic or
+# real workbooks, and reports cell-level differences and speedups. Any change
+# to a fast path should leave every mismatch count at 0. Sheets with section
+# markers other than an exact 'Committed' differ by design: the original only
+# recognised that one marker.
+
+TECHNOLOGIES = ['Solar PV', 'Wind', 'Coal', 'Gas', 'Hydro', 'Battery Storage', None]
+CAPACITIES = [lambda rng: rng.randint(1, 800), lambda rng: round(rng.uniform(1, 800), 2),
+              lambda rng: f"{rng.randint(1, 4)}x{rng.randint(10, 300)}", lambda rng: f"{rng.randint(10, 99)} - 120",
+              lambda rng: 'TBA', lambda rng: None]
+UNIT_STATUSES = ['Pub An', 'Com', 'Advanced', 'In Service', None]
+
+# Most differences listed per check
+MAX_REPORTED = 10
+
+def fast_merge_data(existing_df, new_df, status_column_name):
+    return merge_data(existing_df, records_from_frame(new_df, status_column_name), status_column_name)
+
+def is_blank(value):
+    # None, NaN and '' all end up as an empty cell in the output workbook
+    return value is None or value == '' or (isinstance(value, float) and math.isnan(value)) or value is pd.NA
+
+def cells_equal(expected, actual, rtol, atol):
+    if is_blank(expected) or is_blank(actual):
+        return is_blank(expected) and is_blank(actual)
+    if isinstance(expected, numbers.Number) and isinstance(actual, numbers.Number):
+        return math.isclose(float(expected), float(actual), rel_tol=rtol, abs_tol=atol)
+    return expected == actual
+
+def compare_frames(expected, actual, rtol=1e-9, atol=1e-9):
+    # Cell-by-cell differences as (row, column, expected, actual) tuples;
+    # shape and column differences are reported as a single entry
+    if list(expected.columns) != list(actual.columns):
+        return [(None, 'columns', list(expected.columns), list(actual.columns))]
+    if len(expected) != len(actual):
+        return [(None, 'rows', len(expected), len(actual))]
+
+    differences = []
+    for column in expected.columns:
+        for row, (left, right) in enumerate(zip(expected[column].tolist(), actual[column].tolist())):
+            if not cells_equal(left, right, rtol, atol):
+                differences.append((row, column, left, right))
+    return differences
+
+def timed(function, *args, repeats=1):
+    # Best of several runs, with the extractors' progress output suppressed
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+class CheckResult:
+    def __init__(self, name):
+        self.name = name
+        self.cases = 0
+        self.differences = []
+        self.reference_time = 0.0
+        self.fast_time = 0.0
+
+    def add(self, label, reference, fast, repeats, rtol, atol):
+        expected, reference_time = timed(*reference, repeats=repeats)
+        actual, fast_time = timed(*fast, repeats=repeats)
+        self.cases += 1
+        self.reference_time += reference_time
+        self.fast_time += fast_time
+        self.differences.extend((label,) + difference for difference in compare_frames(expected, actual, rtol, atol))
+        return actual
+
+    def report(self):
+        speedup = self.reference_time / self.fast_time if self.fast_time else math.nan
+        print(f"{self.name:<22} {self.cases:6d} {len(self.differences):11d} "
+              f"{self.reference_time:12.3f} {self.fast_time:10.3f} {speedup:8.2f}x")
+
+    def report_differences(self):
+        for label, row, column, expected, actual in self.differences[:MAX_REPORTED]:
+            print(f"  {self.name} {label} row {row} '{column}': expected {expected!r}, got {actual!r}")
+        if len(self.differences) > MAX_REPORTED:
+            print(f"  ... {len(self.differences) - MAX_REPORTED} more")
+
+def write_sheet(workbook, title, header, rows):
+    worksheet = workbook.create_sheet(title)
+    worksheet.append([title])
+    worksheet.append(header)
+    for row in rows:
+        worksheet.append(row)
+
+def regional_workbook(path, region, sites, rng):
+    # Covers section markers, totals, footnotes, blank rows, capacity strings
+    # and the abbreviated New Developments statuses
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    scheduled = [[f"{region} Station {i}", 'Participant', rng.choice(TECHNOLOGIES), rng.choice(CAPACITIES)(rng)]
+                 for i in range(sites)]
+    # The one section marker the original extraction recognises
+    scheduled.append(['Committed'])
+    scheduled.extend([f"{region} Committed {i}", 'Participant', rng.choice(TECHNOLOGIES), rng.choice(CAPACITIES)(rng)]
+                     for i in range(sites // 5))
+    scheduled += [[None], ['Total', None, None, 1000], ['Note: capacities are nameplate'], ['* excludes mothballed units']]
+    write_sheet(workbook, 'Existing S & SS Generation',
+                ['Power Station', 'Participant', 'Plant Type', 'Unit Numbers and Nameplate Capacity (MW)'], scheduled)
+    write_sheet(workbook, rng.choice(CATEGORY_SHEET_NAMES['non_scheduled']),
+                ['Power Station', 'Participant', 'Plant Type', 'Nameplate Capacity (MW)'],
+                [[f"{region} NS {i}", 'Participant', rng.choice(TECHNOLOGIES), rng.choice(CAPACITIES)(rng)]
+                 for i in range(sites // 3)])
+    write_sheet(workbook, 'New Developments',
+                ['Project', 'Developer', 'Technology Type', 'Nameplate Capacity (MW)', 'Unit Status'],
+                [[f"{region} Project {i}", 'Developer', rng.choice(TECHNOLOGIES), rng.choice(CAPACITIES)(rng),
+                  rng.choice(UNIT_STATUSES)] for i in range(sites)])
+    if rng.random() < 0.5:
+        write_sheet(workbook, 'Existing Wind Generation',
+                    ['Power Station', 'Participant', 'Plant Type', 'Nameplate Capacity (MW)'],
+                    [[f"{region} Wind Farm {i}", 'Participant', 'Wind', rng.choice(CAPACITIES)(rng)]
+                     for i in range(sites // 4)])
+    workbook.save(path)
+
+def nem_workbook(path, sites, rng):
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = SINGLE_SHEET_NAME
+    worksheet.append(['Region', None, 'Site Name', None, 'Technology Type'] + [None] * 7 +
+                     ['Nameplate Capacity (MW)', None, 'Unit Status'])
+    worksheet.append([None] * 15)
+    for region in ['NSW', 'QLD', 'SA', 'TAS', 'VIC']:
+        for i in range(sites):
+            worksheet.append([region, None, f"{region} Project {i}", None, rng.choice(TECHNOLOGIES)] + [None] * 7 +
+                             [rng.choice(CAPACITIES)(rng), None, rng.choice(SECTION_MARKERS + ['In Service'])])
+    workbook.save(path)
+
+def synthetic_workbooks(folder, releases, sites, seed=0):
+    rng = random.Random(seed)
+    dates = pd.date_range('2019-01-01', periods=releases, freq='6MS')
+    for date in dates[:-1]:
+        for region in ['NSW', 'QLD', 'SA']:
+            regional_workbook(os.path.join(folder, f"{region} Generation Information {date:%b %Y}.xlsx"),
+                              region, sites, rng)
+    nem_workbook(os.path.join(folder, f"NEM Generation Information {dates[-1]:%b %Y}.xlsx"), sites, rng)
+    return list_workbook_files(folder)
+
+def run_checks(workbooks, repeats=1, rtol=1e-9, atol=1e-9):
+    sheets = CheckResult('process_sheet')
+    single_sheets = CheckResult('extract_single_sheet')
+    files = CheckResult('process_file')
+    merges = CheckResult('merge_data')
+    extracted = []
+
+    for file_path, status_column_name in workbooks:
+        label = os.path.basename(file_path)
+        files.add(label, (reference_pipeline.process_file, file_path, status_column_name),
+                  (process_file, file_path, status_column_name), repeats, rtol, atol)
+        with pd.ExcelFile(file_path) as xls:
+            layout = detect_layout(xls.sheet_names)
+            if layout == 'nem_single_sheet':
+                extracted.append((single_sheets.add(
+                    label, (reference_pipeline.extract_single_sheet, file_path, SINGLE_SHEET_NAME, status_column_name),
+                    (extract_single_sheet, xls, SINGLE_SHEET_NAME, status_column_name), repeats, rtol, atol),
+                    status_column_name))
+                continue
+            if layout is None:
+                print(f"Skipping {label}: unrecognised layout")
+                continue
+
+            region = extract_region(file_path)
+            frames = []
+            for category, sheet_names in CATEGORY_SHEET_NAMES.items():
+                sheet_name = find_sheet_name(xls, sheet_names)
+                if sheet_name is None:
+                    continue
+                df = read_sheet(xls, sheet_name)
+                frames.append(sheets.add(f"{label} [{sheet_name}]",
+                                         (reference_pipeline.process_sheet, df, region, category, status_column_name),
+                                         (process_sheet, df, region, category, status_column_name),
+                                         repeats, rtol, atol))
+            frames = [frame for frame in frames if not frame.empty]
+            if frames:
+                extracted.append((pd.concat(frames, ignore_index=True), status_column_name))
+
+    # Both merges start from the same extracted frames, so only the merge
+    # step is compared
+    def merge_all(merge):
+        combined_df = empty_combined_frame()
+        for df, status_column_name in extracted:
+            if status_column_name not in combined_df.columns:
+                combined_df[status_column_name] = ''
+            combined_df = merge(combined_df, df, status_column_name)
+        return combined_df
+
+    merges.add('all workbooks', (merge_all, reference_pipeline.merge_data), (merge_all, fast_merge_data),
+               repeats, rtol, atol)
+    return [sheets, single_sheets, files, merges]
+
+def sorted_frame(df):
+    # Merge modes differ in row and snapshot column order only
+    columns = list(df.columns[:4]) + sorted(df.columns[4:], key=str)
+    return df[columns].sort_values(['Region', 'Site Name'], kind='stable').reset_index(drop=True)
+
+def nem_wide_last(workbooks):
+    # The partitioned merge applies NEM-wide workbooks after every regional
+    # one, which is also where they fall in time
+    return sorted(workbooks, key=lambda workbook: extract_region(os.path.basename(workbook[0])) == 'Unknown')
+
+def merge_out_of_core_frame(workbooks, spill_dir):
+    columns = spill_workbooks(workbooks, spill_dir)
+    return pd.DataFrame(list(merged_sites(spill_dir, len(columns))), columns=RECORD_COLUMNS + columns)
+
+def run_merge_mode_checks(workbooks, workers=3, repeats=1, rtol=1e-9, atol=1e-9):
+    # Every merge mode end to end, workbook files in and combined frame out,
+    # against the original extraction and merge
+    modes = CheckResult('merge modes')
+    workbooks = nem_wide_last(workbooks)
+
+    def expected():
+        return sorted_frame(reference_pipeline.merge_workbooks(workbooks))
+
+    def sequential():
+        return sorted_frame(merge_workbooks(workbooks))
+
+    def partitioned():
+        return sorted_frame(merge_region_partitions(workbooks, workers=workers))
+
+    def out_of_core():
+        with tempfile.TemporaryDirectory() as spill_dir:
+            return sorted_frame(merge_out_of_core_frame(workbooks, spill_dir))
+
+    for label, merge in [('sequential', sequential), (f"{workers} workers", partitioned), ('out of core', out_of_core)]:
+        modes.add(label, (expected,), (merge,), repeats, rtol, atol)
+    return modes
+
+def run_resume_checks(workbooks, workers=3, repeats=1, rtol=1e-9, atol=1e-9):
+    # Merge all but one regional workbook, add it back and resume; the result
+    # must match a fresh run over the same workbooks
+    resumes = CheckResult('resume')
+    workbooks = nem_wide_last(workbooks)
+    regional = [workbook for workbook in workbooks if extract_region(os.path.basename(workbook[0])) != 'Unknown']
+    if not regional:
+        return resumes
+    held_out = regional[-1]
+    earlier = [workbook for workbook in workbooks if workbook != held_out]
+
+    def fresh(merge, temp_dir):
+        return sorted_frame(merge(earlier + [held_out], os.path.join(temp_dir, 'fresh.pkl'), False))
+
+    def resumed(merge, temp_dir):
+        checkpoint_path = os.path.join(temp_dir, 'resumed.pkl')
+        merge(earlier, checkpoint_path, False)
+        return sorted_frame(merge(earlier + [held_out], checkpoint_path, True))
+
+    modes = {
+        'sequential': lambda workbooks, checkpoint_path, resume: merge_workbooks(
+            workbooks, checkpoint_path=checkpoint_path, resume=resume),
+        f"{workers} workers": lambda workbooks, checkpoint_path, resume: merge_region_partitions(
+            workbooks, workers=workers, checkpoint_path=checkpoint_path, resume=resume)
+    }
+    for mode, merge in modes.items():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            resumes.add(mode, (fresh, merge, temp_dir), (resumed, merge, temp_dir), 1, rtol, atol)
+    return resumes
+
+def main(input_folder=None, releases=6, sites=200, repeats=1, rtol=1e-9, atol=1e-9, seed=0):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if input_folder:
+            workbooks = list_workbook_files(input_folder)
+        else:
+            workbooks = synthetic_workbooks(temp_dir, releases, sites, seed)
+        print(f"Comparing reference and fast paths on {len(workbooks)} workbooks")
+        results = run_checks(workbooks, repeats, rtol, atol)
+        results.append(run_merge_mode_checks(workbooks, 3, repeats, rtol, atol))
+        results.append(run_resume_checks(workbooks, 3, repeats, rtol, atol))
+
+    print(f"\n{'check':<22} {'cases':>6} {'mismatches':>11} {'reference s':>12} {'fast s':>10} {'speedup':>9}")
+    for result in results:
+        result.report()
+    for result in results:
+        result.report_differences()
+
+    return sum(len(result.differences) for result in results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the fast extraction and merge paths against the reference")
+    parser.add_argument('input_folder', nargs='?', help="Real workbooks to compare on (synthetic ones if omitted)")
+    parser.add_argument('--releases', type=int, default=6, help="Synthetic releases to generate")
+    parser.add_argument('--sites', type=int, default=200, help="Sites per synthetic sheet")
+    parser.add_argument('--repeats', type=int, default=1, help="Timing runs per case (best is kept)")
+    parser.add_argument('--rtol', type=float, default=1e-9, help="Relative tolerance for numeric cells")
+    parser.add_argument('--atol', type=float, default=1e-9, help="Absolute tolerance for numeric cells")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    mismatches = main(args.input_folder, args.releases, args.sites, args.repeats, args.rtol, args.atol, args.seed)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,44 @@
+import math
+
+from openpyxl import Workbook
+
+# Widest sheet Excel will open
+EXCEL_MAX_COLUMNS = 16384
+
+KEY_COLUMNS = ['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity']
+
+def clean_cell(value):
+    # Write-only worksheets do not understand NaN/NA, so blanks are written as empty cells
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if value.__class__.__name__ in ('NAType', 'NaTType'):
+        return None
+    return value
+
+def column_chunks(columns, key_columns, max_columns):
+    # Split the snapshot columns across sheets, repeating the key columns on
+    # each sheet so every sheet can be read on its own
+    key_columns = [column for column in key_columns if column in columns]
+    other_columns = [column for column in columns if column not in key_columns]
+    chunk_width = max_columns - len(key_columns)
+    if chunk_width <= 0:
+        raise ValueError(f"max_columns must be larger than the {len(key_columns)} key columns")
+    if not other_columns:
+        return [key_columns]
+    return [key_columns + other_columns[start:start + chunk_width]
+            for start in range(0, len(other_columns), chunk_width)]
+
+def write_excel(df, output_file, max_columns=EXCEL_MAX_COLUMNS, key_columns=KEY_COLUMNS):
+    # A write-only workbook streams each row to disk as it is appended instead
+    # of building every cell object in memory first
+    workbook = Workbook(write_only=True)
+    chunks = column_chunks(list(df.columns), key_columns, max_columns)
+
+    for sheet_number, columns in enumerate(chunks, start=1):
+        worksheet = workbook.create_sheet(f"Sheet{sheet_number}")
+        worksheet.append([str(column) for column in columns])
+        for row in df[columns].itertuples(index=False, name=None):
+            worksheet.append([clean_cell(value) for value in row])
+
+    workbook.save(output_file)
+    return len(chunks)
@@ -0,0 +1,250 @@
+import re
+
+import pandas as pd
+
+from lookups import (ALL_CATEGORIES, EXISTING_UNIT_STATUSES, HEADER_ALIASES, NOTE_PREFIXES, SHEET_CATEGORIES,
+                     SKIPPED_SITE_NAMES, UNIT_STATUS_NAMES, extract_region, translate_region)
+from sections import assign_sections, site_name_series
+
+CAPACITY_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+UNNAMED_COLUMN = re.compile('^Unnamed')
+
+def find_first_data_row(df):
+    for index, row in df.iterrows():
+        if not row.isna().all():
+            return index
+    return 0
+
+def extract_single_sheet(file_path, sheet_name, status_column_name):
+    df = pd.read_excel(file_path, sheet_name=sheet_name)
+    first_data_row = find_first_data_row(df)
+    
+    new_df = pd.DataFrame({
+        'Region': df.iloc[first_data_row:, 0],
+        'Site Name': df.iloc[first_data_row:, 2],
+        'Technology Type': df.iloc[first_data_row:, 4],
+        'Nameplate Capacity': df.iloc[first_data_row:, 12],
+        status_column_name: df.iloc[first_data_row:, 14]
+    })
+    
+    new_df = new_df.reset_index(drop=True)
+    new_df['Region'] = new_df['Region'].apply(translate_region)
+    
+    # Remove rows with more than two missing entries
+    new_df = new_df.dropna(thresh=3)
+    
+    return new_df
+
+def find_sheet_name(xls, possible_names):
+    return next((name for name in possible_names if name in xls.sheet_names), None)
+
+def is_note_or_statement(text):
+    if not isinstance(text, str):
+        return False
+    return text.startswith(NOTE_PREFIXES) or ':' in text
+
+def extract_max_capacity(capacity_str):
+    if not capacity_str or not isinstance(capacity_str, (str, int, float)):
+        return ''
+    if isinstance(capacity_str, (int, float)):
+        return capacity_str
+    numbers = CAPACITY_NUMBER.findall(str(capacity_str))
+    return max(map(float, numbers)) if numbers else capacity_str
+
+def translate_unit_status(status, sheet_type):
+    if sheet_type == 'new_developments':
+        return UNIT_STATUS_NAMES.get(status, status)
+    return status
+
+def alias_columns(columns, field):
+    # The sheet's columns for a field, in alias order, and the column whose
+    # value is used when none of them has one (the last alias, if present)
+    aliases = HEADER_ALIASES[field]
+    return tuple(alias for alias in aliases if alias in columns), aliases[-1] if aliases[-1] in columns else None
+
+def first_value(row, columns, fallback):
+    for column in columns:
+        value = row[column]
+        if value:
+            return value
+    return row[fallback] if fallback is not None else ''
+
+def process_sheet(df, region, sheet_type, status_column_name):
+    print(f"\nProcessing {sheet_type} sheet:")
+    print(f"Original shape: {df.shape}")
+    print(f"Columns: {df.columns.tolist()}")
+    print(df.head())
+
+    rows_to_keep = []
+    sections, is_section_marker = assign_sections(site_name_series(df), 'In Service')
+    service_status_column = next((col for col in df.columns if 'Service Status' in col), None)
+    site_name_columns = alias_columns(df.columns, 'Site Name')
+    capacity_columns = alias_columns(df.columns, 'Nameplate Capacity')
+    technology_columns = alias_columns(df.columns, 'Technology Type')
+    region_code = translate_region(region)
+
+    for index, row in df.iterrows():
+        site_name = first_value(row, *site_name_columns)
+        
+        if pd.isna(site_name) or site_name in SKIPPED_SITE_NAMES or is_note_or_statement(site_name):
+            continue
+        
+        if is_section_marker[index]:
+            continue
+        
+        nameplate_capacity = first_value(row, *capacity_columns)
+        
+        technology_type = first_value(row, *technology_columns)
+        
+        unit_status = (row.get(service_status_column) if service_status_column else
+                       (row.get('Unit Status', 'Unknown') if sheet_type == 'new_developments' 
+                        else sections[index]))
+        
+        unit_status = translate_unit_status(unit_status, sheet_type)
+        
+        # Count non-empty entries
+        non_empty_count = sum(1 for v in [technology_type, nameplate_capacity, unit_status] if v)
+        
+        # Include the row if at least two of the essential columns have a value
+        if non_empty_count >= 2:
+            new_row = {
+                'Region': region_code,
+                'Site Name': site_name,
+                'Technology Type': technology_type,
+                'Nameplate Capacity': extract_max_capacity(nameplate_capacity),
+                status_column_name: unit_status
+            }
+            rows_to_keep.append(new_row)
+
+    processed_df = pd.DataFrame(rows_to_keep)
+    print(f"\nProcessed {sheet_type} sheet:")
+    print(f"Processed shape: {processed_df.shape}")
+    print(f"Columns: {processed_df.columns.tolist()}")
+    print(processed_df.head())
+    
+    return processed_df
+
+CATEGORY_SHEET_NAMES = {
+    'scheduled': ['Existing S & SS Generation'],
+    'non_scheduled': ['Non-Scheduled Generation', 'Existing NS Generation'],
+    'new_developments': ['New Developments'],
+    'wind': ['Existing Wind Generation']
+}
+
+MISSING_SHEET_WARNINGS = {
+    'scheduled': "Warning: Existing S & SS Generation sheet not found",
+    'non_scheduled': "Warning: Non-Scheduled Generation sheet not found",
+    'new_developments': "Warning: New Developments sheet not found",
+    'wind': "Warning: Existing Wind Generation sheet not found"
+}
+
+SINGLE_SHEET_NAME = 'ExistingGeneration&NewDevs'
+
+# The single sheet does not say which existing-plant sheet a row would have
+# been on, so those categories can only be taken together
+EXISTING_CATEGORIES = ALL_CATEGORIES - {'new_developments'}
+
+def read_sheet(xls, sheet_name):
+    df = xls.parse(sheet_name, header=1)
+    return df.loc[:, ~df.columns.str.contains(UNNAMED_COLUMN)]
+
+class SheetExtraction:
+    # Parses a category's sheet the first time it is accessed, so sheets
+    # outside the requested categories are never read.
+    def __init__(self, xls, region, status_column_name, categories=ALL_CATEGORIES, required_categories=()):
+        unknown = set(categories) - ALL_CATEGORIES
+        if unknown:
+            raise ValueError(f"Unknown sheet categories: {sorted(unknown)}")
+
+        self.xls = xls
+        self.region = region
+        self.status_column_name = status_column_name
+        self.categories = [category for category in SHEET_CATEGORIES if category in categories]
+        self.required_categories = set(required_categories)
+        self._frames = {}
+
+    def __getitem__(self, category):
+        if category not in self.categories:
+            raise KeyError(category)
+        if category not in self._frames:
+            self._frames[category] = self._extract(category)
+        return self._frames[category]
+
+    def _extract(self, category):
+        sheet_name = find_sheet_name(self.xls, CATEGORY_SHEET_NAMES[category])
+        if sheet_name is None:
+            if category in self.required_categories:
+                raise ValueError(f"Worksheet named '{CATEGORY_SHEET_NAMES[category][0]}' not found")
+            print(MISSING_SHEET_WARNINGS[category])
+            return pd.DataFrame()
+        return process_sheet(read_sheet(self.xls, sheet_name), self.region, category, self.status_column_name)
+
+    def combined(self):
+        all_dfs = [self[category] for category in self.categories]
+        all_dfs = [df for df in all_dfs if not df.empty]
+        if not all_dfs:
+            return pd.DataFrame()
+        return pd.concat(all_dfs, ignore_index=True)
+
+# Extractors keyed by workbook layout, in detection order. Each entry holds a
+# detect(sheet_names) predicate and an extract(xls, file_path,
+# status_column_name, categories) function returning the extracted rows.
+EXTRACTORS = {}
+
+def register_extractor(layout, detect):
+    def decorator(extract):
+        EXTRACTORS[layout] = (detect, extract)
+        return extract
+    return decorator
+
+def detect_layout(sheet_names):
+    return next((layout for layout, (detect, _) in EXTRACTORS.items() if detect(sheet_names)), None)
+
+@register_extractor('nem_single_sheet', lambda sheet_names: SINGLE_SHEET_NAME in sheet_names)
+def extract_nem_single_sheet(xls, file_path, status_column_name, categories):
+    # NEM-wide workbooks (2024 onwards) hold every region, existing plant and
+    # new developments in one sheet; rows are split by unit status
+    unknown = set(categories) - ALL_CATEGORIES
+    if unknown:
+        raise ValueError(f"Unknown sheet categories: {sorted(unknown)}")
+    existing = set(categories) & EXISTING_CATEGORIES
+    if existing and existing != EXISTING_CATEGORIES:
+        raise ValueError(f"{SINGLE_SHEET_NAME} cannot be split into {sorted(existing)}; "
+                         f"request all of {sorted(EXISTING_CATEGORIES)} or none")
+
+    print(f"Found {SINGLE_SHEET_NAME} sheet. Processing single sheet.")
+    df = extract_single_sheet(xls, SINGLE_SHEET_NAME, status_column_name)
+    if existing and 'new_developments' in categories:
+        return df
+    is_existing = df[status_column_name].astype(str).str.strip().isin(EXISTING_UNIT_STATUSES)
+    return df[is_existing if existing else ~is_existing]
+
+@register_extractor('regional_multi_sheet',
+                    lambda sheet_names: 'Existing S & SS Generation' in sheet_names and 'New Developments' in sheet_names)
+def extract_regional_sheets(xls, file_path, status_column_name, categories):
+    print(f"{SINGLE_SHEET_NAME} sheet not found. Processing multiple sheets.")
+    extraction = SheetExtraction(xls, extract_region(file_path), status_column_name, categories,
+                                 required_categories={'scheduled', 'new_developments'})
+    return extraction.combined()
+
+@register_extractor('regional_existing_only', lambda sheet_names: 'Existing S & SS Generation' in sheet_names)
+def extract_regional_existing_sheets(xls, file_path, status_column_name, categories):
+    # Early regional workbooks list existing and committed plant only
+    print("New Developments sheet not found. Processing existing generation sheets.")
+    extraction = SheetExtraction(xls, extract_region(file_path), status_column_name,
+                                 set(categories) - {'new_developments'}, required_categories={'scheduled'})
+    return extraction.combined()
+
+def extract_workbook(file_path, status_column_name, categories=ALL_CATEGORIES):
+    # Single dispatch point: open the workbook once, detect its layout and
+    # hand it to the matching extractor
+    with pd.ExcelFile(file_path) as xls:
+        layout = detect_layout(xls.sheet_names)
+        if layout is None:
+            raise ValueError(f"Unrecognised workbook layout with sheets {xls.sheet_names}")
+        _, extract = EXTRACTORS[layout]
+        return extract(xls, file_path, status_column_name, categories)
+
+def process_file(file_path, status_column_name, categories=ALL_CATEGORIES):
+    print(f"\nProcessing file: {file_path}")
+    return extract_workbook(file_path, status_column_name, categories)
@@ -1,192 +1,61 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
 import re
 import os
+import sys
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 
-def extract_region(filename):
-    states = ['NSW', 'QLD', 'SA', 'TAS', 'VIC']
-    return next((state for state in states if state in filename), 'Unknown')
-
-def translate_region(region):
-    region_mapping = {
-        'NSW': 'NSW1',
-        'QLD': 'QLD1',
-        'SA': 'SA1',
-        'TAS': 'TAS1',
-        'VIC': 'VIC1'
-    }
-    return region_mapping.get(region, region)
-
-def find_first_data_row(df):
-    for index, row in df.iterrows():
-        if not row.isna().all():
-            return index
-    return 0
-
-def extract_single_sheet(file_path, sheet_name, status_column_name):
-    df = pd.read_excel(file_path, sheet_name=sheet_name)
-    first_data_row = find_first_data_row(df)
-    
-    new_df = pd.DataFrame({
-        'Region': df.iloc[first_data_row:, 0],
-        'Site Name': df.iloc[first_data_row:, 2],
-        'Technology Type': df.iloc[first_data_row:, 4],
-        'Nameplate Capacity': df.iloc[first_data_row:, 12],
-        status_column_name: df.iloc[first_data_row:, 14]
-    })
-    
-    new_df = new_df.reset_index(drop=True)
-    new_df['Region'] = new_df['Region'].apply(translate_region)
-    
-    # Remove rows with more than two missing entries
-    new_df = new_df.dropna(thresh=3)
-    
-    return new_df
-
-def find_sheet_name(excel_file, possible_names):
-    with pd.ExcelFile(excel_file) as xls:
-        return next((name for name in possible_names if name in xls.sheet_names), None)
-
-def is_note_or_statement(text):
-    if not isinstance(text, str):
-        return False
-    return text.startswith('Note:') or text.startswith('*') or text.startswith('a.') or ':' in text
-
-def extract_max_capacity(capacity_str):
-    if not capacity_str or not isinstance(capacity_str, (str, int, float)):
-        return ''
-    if isinstance(capacity_str, (int, float)):
-        return capacity_str
-    numbers = re.findall(r'\d+(?:\.\d+)?', str(capacity_str))
-    return max(map(float, numbers)) if numbers else capacity_str
-
-def translate_unit_status(status, sheet_type):
-    if sheet_type == 'new_developments':
-        if status == 'Pub An':
-            return 'Publicly Announced'
-        elif status == 'Com':
-            return 'Committed'
-    return status
-
-def process_sheet(df, region, sheet_type, status_column_name):
-    print(f"\nProcessing {sheet_type} sheet:")
-    print(f"Original shape: {df.shape}")
-    print(f"Columns: {df.columns.tolist()}")
-    print(df.head())
-
-    rows_to_keep = []
-    committed_encountered = False
-    service_status_column = next((col for col in df.columns if 'Service Status' in col), None)
-
-    for index, row in df.iterrows():
-        site_name = row.get('Power Station') or row.get('Project', '') or row.get('  Project', '')
-        
-        if pd.isna(site_name) or site_name == 'Total' or is_note_or_statement(site_name):
-            continue
-        
-        if site_name == 'Committed':
-            committed_encountered = True
-            continue
-        
-        nameplate_capacity = (row.get('Unit Number and Nameplate Capacity (MW)') or 
-                              row.get('Unit Numbers and Nameplate Capacity (MW)') or 
-                              row.get('Nameplate Capacity (MW)', '') or
-                              row.get('Nameplate Capacity (MW)a', '') or
-                              row.get('Nameplate Capacity (MW)^a', ''))
-        
-        technology_type = row.get('Plant Type') or row.get('Technology Type') or row.get('Generation Type', '')
-        
-        unit_status = (row.get(service_status_column) if service_status_column else
-                       (row.get('Unit Status', 'Unknown') if sheet_type == 'new_developments' 
-                        else ('Committed' if committed_encountered else 'In Service')))
-        
-        unit_status = translate_unit_status(unit_status, sheet_type)
-        
-        # Count non-empty entries
-        non_empty_count = sum(1 for v in [technology_type, nameplate_capacity, unit_status] if v)
-        
-        # Include the row if at least two of the essential columns have a value
-        if non_empty_count >= 2:
-            new_row = {
-                'Region': translate_region(region),
-                'Site Name': site_name,
-                'Technology Type': technology_type,
-                'Nameplate Capacity': extract_max_capacity(nameplate_capacity),
-                status_column_name: unit_status
-            }
-            rows_to_keep.append(new_row)
-
-    processed_df = pd.DataFrame(rows_to_keep)
-    print(f"\nProcessed {sheet_type} sheet:")
-    print(f"Processed shape: {processed_df.shape}")
-    print(f"Columns: {processed_df.columns.tolist()}")
-    print(processed_df.head())
-    
-    return processed_df
+from checkpoint import (CHECKPOINT_FILE, CHECKPOINT_INTERVAL, load_checkpoint, load_extracted,
+                        partition_checkpoint_path, save_checkpoint, save_extracted)
+from lookups import ALL_CATEGORIES, extract_region, parse_snapshot_date, translate_region
 
-def process_file(file_path, status_column_name):
-    print(f"\nProcessing file: {file_path}")
-    region = extract_region(file_path)
+# pandas and the modules built on it are imported in the functions that use
+# them, so --help and callers that only list or filter workbooks stay cheap
 
-    # Check if ExistingGeneration&NewDevs sheet exists
-    single_sheet_name = 'ExistingGeneration&NewDevs'
-    if single_sheet_name in pd.ExcelFile(file_path).sheet_names:
-        print(f"Found {single_sheet_name} sheet. Processing single sheet.")
-        return extract_single_sheet(file_path, single_sheet_name, status_column_name)
-    
-    print(f"{single_sheet_name} sheet not found. Processing multiple sheets.")
-    
-    # Process sheets
-    df_scheduled = pd.read_excel(file_path, sheet_name='Existing S & SS Generation', header=1)
-    df_scheduled = df_scheduled.loc[:, ~df_scheduled.columns.str.contains('^Unnamed')]
-    new_df_scheduled = process_sheet(df_scheduled, region, 'scheduled', status_column_name)
-
-    non_scheduled_sheet_name = find_sheet_name(file_path, ['Non-Scheduled Generation', 'Existing NS Generation'])
-    if non_scheduled_sheet_name:
-        df_non_scheduled = pd.read_excel(file_path, sheet_name=non_scheduled_sheet_name, header=1)
-        df_non_scheduled = df_non_scheduled.loc[:, ~df_non_scheduled.columns.str.contains('^Unnamed')]
-        new_df_non_scheduled = process_sheet(df_non_scheduled, region, 'non_scheduled', status_column_name)
-    else:
-        print("Warning: Non-Scheduled Generation sheet not found")
-        new_df_non_scheduled = pd.DataFrame()
-
-    df_new_developments = pd.read_excel(file_path, sheet_name='New Developments', header=1)
-    df_new_developments = df_new_developments.loc[:, ~df_new_developments.columns.str.contains('^Unnamed')]
-    new_df_new_developments = process_sheet(df_new_developments, region, 'new_developments', status_column_name)
-
-    wind_sheet_name = 'Existing Wind Generation'
-    if wind_sheet_name in pd.ExcelFile(file_path).sheet_names:
-        df_wind = pd.read_excel(file_path, sheet_name=wind_sheet_name, header=1)
-        df_wind = df_wind.loc[:, ~df_wind.columns.str.contains('^Unnamed')]
-        new_df_wind = process_sheet(df_wind, region, 'wind', status_column_name)
-    else:
-        print("Warning: Existing Wind Generation sheet not found")
-        new_df_wind = pd.DataFrame()
-
-    # Combine all DataFrames
-    all_dfs = [new_df_scheduled, new_df_non_scheduled, new_df_new_developments]
-    if not new_df_wind.empty:
-        all_dfs.append(new_df_wind)
-    return pd.concat(all_dfs, ignore_index=True)
-
-def merge_data(existing_df, new_df, status_column_name):
-    for _, row in new_df.iterrows():
-        site_name = row['Site Name']
-        existing_row = existing_df[existing_df['Site Name'] == site_name]
-        
-        if not existing_row.empty:
-            # Update existing row
-            idx = existing_row.index[0]
-            existing_df.at[idx, 'Technology Type'] = row['Technology Type']
-            existing_df.at[idx, 'Nameplate Capacity'] = row['Nameplate Capacity']
-            existing_df.at[idx, status_column_name] = row[status_column_name]
+def merge_data(existing_df, records, status_column_name):
+    import pandas as pd
+
+    from site_records import MISSING_CODE, SITE_NAMES, records_to_frame
+
+    # Index existing sites once by their interned id, so matching a record
+    # is an integer lookup; the first row for a site name wins, as before.
+    site_index = {}
+    for position, site_id in enumerate(SITE_NAMES.encode_many(existing_df['Site Name'])):
+        if site_id != MISSING_CODE:
+            site_index.setdefault(site_id, position)
+
+    updates = {}
+    new_records = []
+    new_index = {}
+    for record in records:
+        site_key = record.site_key
+        if site_key == MISSING_CODE:
+            new_records.append(record)
+        elif site_key in site_index:
+            updates[site_index[site_key]] = record
+        elif site_key in new_index:
+            # Later rows for a newly added site update it but keep its region
+            first = new_records[new_index[site_key]]
+            first.technology, first.capacity, first.status = record.technology, record.capacity, record.status
         else:
-            # Add new row
-            new_row = row.to_dict()
-            existing_df = existing_df.append(new_row, ignore_index=True)
-    
+            new_index[site_key] = len(new_records)
+            new_records.append(record)
+
+    if updates:
+        positions = list(updates)
+        updated = records_to_frame([updates[position] for position in positions], status_column_name)
+        for column in ['Technology Type', 'Nameplate Capacity', status_column_name]:
+            column_position = existing_df.columns.get_loc(column)
+            existing_df[column] = existing_df[column].astype(object)
+            existing_df.iloc[positions, column_position] = updated[column].to_numpy()
+
+    if new_records:
+        existing_df = pd.concat([existing_df, records_to_frame(new_records, status_column_name)],
+                                ignore_index=True)
+
     return existing_df
 
 def extract_date_from_filename(filename):
@@ -212,51 +81,291 @@ def extract_date_from_filename(filename):
                 return None, None
     return None, None
 
-def main(input_folder):
-    combined_df = pd.DataFrame(columns=['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity'])
-    month_year_counter = defaultdict(int)
-    
-    # Process files in the main folder
+def file_digest(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def list_workbook_files(input_folder):
+    workbook_files = []
+
+    # Files in the main folder are named after their snapshot date
     for item in os.listdir(input_folder):
         item_path = os.path.join(input_folder, item)
         
         if os.path.isfile(item_path) and item.endswith('.xlsx'):
-            status_column_name, month_year = extract_date_from_filename(item)
+            status_column_name, _ = extract_date_from_filename(item)
             if not status_column_name:
                 status_column_name = os.path.splitext(item)[0]  # Use filename without extension if date not found
-            else:
-                if month_year:
-                    month_year_counter[month_year] += 1
-                    if month_year_counter[month_year] > 1:
-                        status_column_name = f"{month_year_counter[month_year]} {status_column_name}"
-            
-            try:
-                processed_data = process_file(item_path, status_column_name)
-                
-                if status_column_name not in combined_df.columns:
-                    combined_df[status_column_name] = ''
-                
-                combined_df = merge_data(combined_df, processed_data, status_column_name)
-            except Exception as e:
-                print(f"Error processing file {item}: {str(e)}")
+            workbook_files.append((item_path, status_column_name))
         
         elif os.path.isdir(item_path):
-            # Process files in subfolders
+            # Files in subfolders take the name of their folder
             for root, _, files in os.walk(item_path):
                 for file in files:
                     if file.endswith('.xlsx'):
                         file_path = os.path.join(root, file)
-                        status_column_name = os.path.basename(os.path.dirname(file_path))
-                        
-                        try:
-                            processed_data = process_file(file_path, status_column_name)
-                            
-                            if status_column_name not in combined_df.columns:
-                                combined_df[status_column_name] = ''
-                            
-                            combined_df = merge_data(combined_df, processed_data, status_column_name)
-                        except Exception as e:
-                            print(f"Error processing file {file}: {str(e)}")
+                        workbook_files.append((file_path, os.path.basename(os.path.dirname(file_path))))
+
+    return workbook_files
+
+def workbook_in_range(file_path, status_column_name, regions=None, date_from=None, date_to=None):
+    # Decided from the file and folder names alone, so workbooks outside the
+    # selection are never opened. NEM-wide workbooks cover every region and
+    # are kept; their rows are filtered after the merge.
+    if regions:
+        region = extract_region(os.path.basename(file_path))
+        if region != 'Unknown' and translate_region(region) not in {translate_region(wanted) for wanted in regions}:
+            return False
+
+    if date_from or date_to:
+        date = parse_snapshot_date(status_column_name)
+        if date is None or (date_from and date < date_from) or (date_to and date > date_to):
+            return False
+
+    return True
+
+def collect_workbooks(input_folders, regions=None, date_from=None, date_to=None):
+    # Snapshots are keyed by (date, region). Regional files for the same date
+    # share one status column, since their sites never overlap, and files
+    # whose content was already seen are skipped without being parsed.
+    if isinstance(input_folders, str):
+        input_folders = [input_folders]
+    workbooks = []
+    seen_digests = {}
+    snapshot_files = defaultdict(list)
+
+    workbook_files = [workbook for input_folder in input_folders for workbook in list_workbook_files(input_folder)]
+    skipped = 0
+    for file_path, status_column_name in workbook_files:
+        if not workbook_in_range(file_path, status_column_name, regions, date_from, date_to):
+            skipped += 1
+            continue
+
+        digest = file_digest(file_path)
+        if digest in seen_digests:
+            print(f"Skipping {os.path.basename(file_path)}: identical to {os.path.basename(seen_digests[digest])}")
+            continue
+        seen_digests[digest] = file_path
+
+        snapshot_key = (status_column_name, extract_region(os.path.basename(file_path)))
+        snapshot_files[snapshot_key].append(file_path)
+        if len(snapshot_files[snapshot_key]) > 1:
+            print(f"Warning: {len(snapshot_files[snapshot_key])} different files for snapshot {snapshot_key}; "
+                  f"later files update earlier ones")
+        workbooks.append((file_path, status_column_name))
+
+    if skipped:
+        print(f"Skipped {skipped} workbooks outside the selected regions and dates")
+    return workbooks
+
+def empty_combined_frame():
+    import pandas as pd
+    return pd.DataFrame(columns=['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity'])
+
+def merge_workbooks(workbooks, categories=ALL_CATEGORIES, combined_df=None, checkpoint_path=None, resume=False,
+                    site_master_path=None):
+    from extractors import process_file
+    from site_master import SiteMaster
+    from site_records import records_from_frame
+
+    site_master = SiteMaster(site_master_path) if site_master_path else None
+    completed = []
+    # A frame passed in is the caller's current state and must not be
+    # replaced by an older checkpoint
+    if resume and checkpoint_path and combined_df is None:
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint:
+            combined_df, completed = checkpoint
+            print(f"Resuming from '{checkpoint_path}': {len(completed)} workbooks already merged")
+
+    if combined_df is None:
+        combined_df = empty_combined_frame()
+
+    already_merged = set(completed)
+    for file_path, status_column_name in workbooks:
+        if file_path in already_merged:
+            continue
+
+        try:
+            processed_data = process_file(file_path, status_column_name, categories)
+            # Upsert first, so a site-master error leaves the workbook unmerged
+            # and it is retried on --resume
+            if site_master:
+                site_master.upsert_workbook(processed_data, status_column_name)
+            
+            if status_column_name not in combined_df.columns:
+                combined_df[status_column_name] = ''
+            
+            combined_df = merge_data(combined_df, records_from_frame(processed_data, status_column_name), status_column_name)
+        except Exception as e:
+            print(f"Error processing file {os.path.basename(file_path)}: {str(e)}")
+            continue
+
+        completed.append(file_path)
+        if checkpoint_path and len(completed) % CHECKPOINT_INTERVAL == 0:
+            save_checkpoint(checkpoint_path, combined_df, completed)
+
+    if checkpoint_path:
+        save_checkpoint(checkpoint_path, combined_df, completed)
+    if site_master:
+        site_master.close()
+
+    return combined_df
+
+def group_workbooks_by_region(workbooks):
+    partitions = defaultdict(list)
+    for file_path, status_column_name in workbooks:
+        partitions[extract_region(os.path.basename(file_path))].append((file_path, status_column_name))
+    return partitions
+
+def merge_region_partitions(workbooks, categories=ALL_CATEGORIES, workers=None, checkpoint_path=None, resume=False,
+                            site_master_path=None):
+    # Regional archives never share sites, so each region is extracted and
+    # merged in its own process and the results are simply concatenated.
+    # NEM-wide workbooks (region 'Unknown') cover every region and are
+    # merged into the combined result afterwards.
+    from concurrent.futures import ProcessPoolExecutor
+
+    import pandas as pd
+
+    partitions = group_workbooks_by_region(workbooks)
+    nem_wide_workbooks = partitions.pop('Unknown', [])
+
+    partition_dfs = []
+    if partitions:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(merge_workbooks, region_workbooks, categories, None,
+                                partition_checkpoint_path(checkpoint_path, region) if checkpoint_path else None,
+                                resume, site_master_path)
+                for region, region_workbooks in partitions.items()
+            ]
+            partition_dfs = [future.result() for future in futures]
+
+    partition_dfs = [df for df in partition_dfs if not df.empty]
+    combined_df = pd.concat(partition_dfs, ignore_index=True) if partition_dfs else empty_combined_frame()
+    return merge_nem_wide(nem_wide_workbooks, categories, combined_df,
+                          partition_checkpoint_path(checkpoint_path, 'nem_wide') if checkpoint_path else None,
+                          resume, site_master_path)
+
+def merge_nem_wide(workbooks, categories, combined_df, checkpoint_path=None, resume=False, site_master_path=None):
+    # NEM-wide workbooks are merged on top of the regional partitions, which
+    # change whenever a regional workbook is added, so this stage checkpoints
+    # the extracted rows and replays their merge rather than a merged frame
+    from extractors import process_file
+    from site_master import SiteMaster
+    from site_records import records_from_frame
+
+    extracted = load_extracted(checkpoint_path) if resume and checkpoint_path else {}
+    if extracted:
+        print(f"Resuming from '{checkpoint_path}': {len(extracted)} NEM-wide workbooks already extracted")
+
+    site_master = SiteMaster(site_master_path) if site_master_path else None
+    try:
+        for file_path, status_column_name in workbooks:
+            if file_path not in extracted:
+                try:
+                    processed_data = process_file(file_path, status_column_name, categories)
+                    if site_master:
+                        site_master.upsert_workbook(processed_data, status_column_name)
+                except Exception as e:
+                    print(f"Error processing file {os.path.basename(file_path)}: {str(e)}")
+                    continue
+                extracted[file_path] = processed_data
+
+            if status_column_name not in combined_df.columns:
+                combined_df[status_column_name] = ''
+            combined_df = merge_data(combined_df, records_from_frame(extracted[file_path], status_column_name),
+                                     status_column_name)
+    finally:
+        if site_master:
+            site_master.close()
+
+    if checkpoint_path:
+        save_extracted(checkpoint_path, {file_path: extracted[file_path] for file_path, _ in workbooks
+                                         if file_path in extracted})
+    return combined_df
+
+def columns_in_range(columns, date_from=None, date_to=None):
+    kept_columns = []
+    for column in columns:
+        date = parse_snapshot_date(column)
+        if date_from or date_to:
+            if date is None or (date_from and date < date_from) or (date_to and date > date_to):
+                continue
+        kept_columns.append(column)
+    return kept_columns
+
+def filter_combined(combined_df, regions=None, date_from=None, date_to=None):
+    if regions:
+        combined_df = combined_df[combined_df['Region'].isin({translate_region(region) for region in regions})]
+
+    if date_from or date_to:
+        kept_columns = columns_in_range(combined_df.columns[4:], date_from, date_to)
+        combined_df = combined_df.drop(columns=[column for column in combined_df.columns[4:]
+                                                if column not in kept_columns])
+
+    return combined_df.reset_index(drop=True)
+
+OUTPUT_FORMATS = ['xlsx', 'csv', 'pickle', 'sqlite']
+
+def write_output(combined_df, output_file, output_format='xlsx'):
+    import sqlite3
+
+    from excel_export import write_excel
+
+    if output_format == 'xlsx':
+        write_excel(combined_df, output_file)
+    elif output_format == 'csv':
+        combined_df.to_csv(output_file, index=False)
+    elif output_format == 'pickle':
+        combined_df.to_pickle(output_file)
+    elif output_format == 'sqlite':
+        with sqlite3.connect(output_file) as conn:
+            combined_df.to_sql('combined', conn, if_exists='replace', index=False)
+    else:
+        raise ValueError(f"Unknown output format '{output_format}'")
+
+def merge_out_of_core(workbooks, spill_dir, categories=ALL_CATEGORIES, resume=False, site_master_path=None,
+                      output_file='extracted2.xlsx', output_format='xlsx', regions=None, date_from=None,
+                      date_to=None, layout='wide'):
+    # Bounded-memory alternative to merge_workbooks for archives whose
+    # combined frame does not fit in memory; rows come out grouped by region
+    # and sorted by site name rather than in order of first appearance
+    from spill_merge import spill_workbooks, write_merged
+
+    columns = spill_workbooks(workbooks, spill_dir, categories, resume, site_master_path)
+    if not columns:
+        print("No data processed. Check your input folder and file types.")
+        return
+
+    region_codes = {translate_region(region) for region in regions} if regions else None
+    rows = write_merged(spill_dir, columns, output_file, output_format, columns_in_range(columns, date_from, date_to),
+                        region_codes, layout)
+    print(f"\nData has been merged from '{spill_dir}' and saved to '{output_file}'")
+    print(f"Total rows extracted: {rows}")
+
+def main(input_folders, categories=ALL_CATEGORIES, workers=1, checkpoint_path=CHECKPOINT_FILE, resume=False,
+         site_master_path=None, output_file='extracted2.xlsx', output_format='xlsx', regions=None,
+         date_from=None, date_to=None, layout='wide', spill_dir=None):
+    from snapshots import to_long
+
+    workbooks = collect_workbooks(input_folders, regions, date_from, date_to)
+    if spill_dir:
+        merge_out_of_core(workbooks, spill_dir, categories, resume, site_master_path, output_file, output_format,
+                          regions, date_from, date_to, layout)
+        return
+
+    if workers == 1:
+        combined_df = merge_workbooks(workbooks, categories, None, checkpoint_path, resume, site_master_path)
+    else:
+        combined_df = merge_region_partitions(workbooks, categories, workers, checkpoint_path, resume, site_master_path)
+    combined_df = filter_combined(combined_df, regions, date_from, date_to)
+    if layout == 'long':
+        combined_df = to_long(combined_df)
     
     if combined_df.empty:
         print("No data processed. Check your input folder and file types.")
@@ -268,14 +377,114 @@ def main(input_folder):
     print(f"Columns: {combined_df.columns.tolist()}")
     print(combined_df.head())
 
-    # Save the extracted data to a new Excel file
-    output_file = 'extracted2.xlsx'
-    combined_df.to_excel(output_file, index=False)
+    # Save the extracted data
+    write_output(combined_df, output_file, output_format)
     print(f"\nData has been extracted and saved to '{output_file}'")
 
     # Print total number of rows extracted
     print(f"Total rows extracted: {len(combined_df)}")
 
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def worker_count(value):
+    workers = int(value)
+    if workers < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {workers}")
+    return workers
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract and merge AEMO generation information workbooks")
+    parser.add_argument('input_folders', nargs='*', metavar='input_folder',
+                        help="Folders containing Excel files and subfolders")
+    parser.add_argument('--config', help="JSON file of option values; command-line options take precedence")
+    parser.add_argument('--output', default='extracted2.xlsx', help="Output file")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='xlsx',
+                        help="Output format")
+    parser.add_argument('--workers', type=worker_count, default=1,
+                        help="Worker processes; more than one merges each region in parallel "
+                             "(not with --out-of-core)")
+    parser.add_argument('--cache-dir', default='.', help="Directory for checkpoints")
+    parser.add_argument('--regions', nargs='+', help="Only keep these regions, e.g. QLD VIC")
+    parser.add_argument('--date-from', type=parse_date, help="Only keep snapshots on or after YYYY-MM-DD")
+    parser.add_argument('--date-to', type=parse_date, help="Only keep snapshots on or before YYYY-MM-DD")
+    parser.add_argument('--categories', nargs='+', choices=sorted(ALL_CATEGORIES), default=sorted(ALL_CATEGORIES),
+                        help="Sheet categories to extract")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue from the last checkpoint in the cache directory instead of starting again")
+    parser.add_argument('--site-master', help="SQLite site master to upsert every merged workbook into")
+    parser.add_argument('--layout', choices=['wide', 'long'], default='wide',
+                        help="One column per snapshot, or one row per site and snapshot")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="Spill extracted workbooks to the cache directory and stream the merge from disk "
+                             "in a single process")
+    return parser
+
+def check_config(parser, config_path, config):
+    # Config values bypass argparse's type and choice checks, so they are
+    # converted and checked here, with the same errors as on the command line
+    for key in ['date_from', 'date_to']:
+        if config.get(key):
+            try:
+                config[key] = parse_date(config[key])
+            except (TypeError, ValueError):
+                parser.error(f"{key} in {config_path}: expected YYYY-MM-DD, got {config[key]!r}")
+    if 'workers' in config:
+        try:
+            config['workers'] = worker_count(config['workers'])
+        except (argparse.ArgumentTypeError, TypeError, ValueError) as e:
+            parser.error(f"workers in {config_path}: {e}")
+    for key, choices in [('categories', ALL_CATEGORIES), ('regions', None)]:
+        if config.get(key) is None:
+            continue
+        if not isinstance(config[key], list):
+            parser.error(f"{key} in {config_path}: expected a list, got {config[key]!r}")
+        invalid = [value for value in config[key] if not isinstance(value, str) or (choices and value not in choices)]
+        if invalid:
+            parser.error(f"{key} in {config_path}: invalid values {invalid}"
+                         + (f" (choose from {sorted(choices)})" if choices else ""))
+    for key, name, choices in [('output_format', 'format', OUTPUT_FORMATS), ('layout', 'layout', ['wide', 'long'])]:
+        if key in config and config[key] not in choices:
+            parser.error(f"{name} in {config_path}: {config[key]!r} is not one of {choices}")
+
+def parse_args(argv=None):
+    # Options can come from a JSON config file (keys are the long option
+    # names with dashes or underscores); explicit command-line options win
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.config:
+        with open(args.config) as f:
+            config = {key.replace('-', '_'): value for key, value in json.load(f).items()}
+        if 'format' in config:
+            config['output_format'] = config.pop('format')
+        check_config(parser, args.config, config)
+        unknown = set(config) - set(vars(args))
+        if unknown:
+            parser.error(f"Unknown options in {args.config}: {sorted(unknown)}")
+        parser.set_defaults(**config)
+        args = parser.parse_args(argv)
+    return args
+
+def run(argv=None):
+    args = parse_args(argv)
+    input_folders = args.input_folders
+    if not input_folders:
+        if not sys.stdin.isatty():
+            raise SystemExit("No input folder given")
+        input_folders = [input("Enter the path to the folder containing Excel files and subfolders: ")]
+
+    if args.out_of_core and args.output_format == 'pickle':
+        raise SystemExit("--out-of-core writes xlsx, csv or sqlite output")
+    if args.out_of_core and args.workers > 1:
+        raise SystemExit("--out-of-core runs in a single process; drop --workers")
+
+    from spill_merge import SPILL_DIR
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    spill_dir = os.path.join(args.cache_dir, SPILL_DIR) if args.out_of_core else None
+    main(input_folders, set(args.categories), args.workers, os.path.join(args.cache_dir, CHECKPOINT_FILE),
+         args.resume, args.site_master, args.output, args.output_format, args.regions, args.date_from, args.date_to,
+         args.layout, spill_dir)
+
 if __name__ == "__main__":
-    input_folder = input("Enter the path to the folder containing Excel files and subfolders: ")
-    main(input_folder)
+    run()
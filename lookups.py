@@ -0,0 +1,65 @@
+from datetime import datetime
+from types import MappingProxyType
+
+# Read-only lookup tables shared by the extractors. They are built once when
+# the module is imported, so every worker process holds one copy and per-row
+# lookups are plain dictionary hits.
+
+# State abbreviation in a file name -> NEM region code
+STATE_REGION_CODES = MappingProxyType({
+    'NSW': 'NSW1',
+    'QLD': 'QLD1',
+    'SA': 'SA1',
+    'TAS': 'TAS1',
+    'VIC': 'VIC1'
+})
+
+STATES = tuple(STATE_REGION_CODES)
+
+def extract_region(filename):
+    return next((state for state in STATES if state in filename), 'Unknown')
+
+def translate_region(region):
+    return STATE_REGION_CODES.get(region, region)
+
+# Snapshot column names as full_automation_algo writes them
+SNAPSHOT_NAME_FORMATS = ["%d %B %Y", "%B %Y"]
+
+def parse_snapshot_date(status_column_name):
+    for date_format in SNAPSHOT_NAME_FORMATS:
+        try:
+            return datetime.strptime(status_column_name, date_format)
+        except ValueError:
+            pass
+    return None
+
+# Sheet categories of the regional workbooks, in extraction order
+SHEET_CATEGORIES = ['scheduled', 'non_scheduled', 'new_developments', 'wind']
+ALL_CATEGORIES = frozenset(SHEET_CATEGORIES)
+
+# Abbreviated unit statuses used on the New Developments sheets
+UNIT_STATUS_NAMES = MappingProxyType({
+    'Pub An': 'Publicly Announced',
+    'Com': 'Committed'
+})
+
+# Unit statuses of existing plant on the NEM-wide single sheet; every other
+# status is a new development
+EXISTING_UNIT_STATUSES = frozenset(['In Service', 'In Commissioning', 'Announced Withdrawal'])
+
+# Column headers that hold each field, in order of preference
+HEADER_ALIASES = MappingProxyType({
+    'Site Name': ('Power Station', 'Project', '  Project'),
+    'Technology Type': ('Plant Type', 'Technology Type', 'Generation Type'),
+    'Nameplate Capacity': ('Unit Number and Nameplate Capacity (MW)',
+                           'Unit Numbers and Nameplate Capacity (MW)',
+                           'Nameplate Capacity (MW)',
+                           'Nameplate Capacity (MW)a',
+                           'Nameplate Capacity (MW)^a')
+})
+
+# Site name cells starting with one of these, or containing a colon, are
+# footnotes rather than sites
+NOTE_PREFIXES = ('Note:', '*', 'a.')
+
+SKIPPED_SITE_NAMES = frozenset(['Total'])
@@ -1,13 +1,26 @@
-import pandas as pd
-from dateutil import parser
+import argparse
+import json
+import os
+import sys
 from datetime import datetime
 import re
 
+# pandas, dateutil and the modules built on them are imported where they are
+# used, so --help and the worker's startup stay cheap and a long-lived worker
+# pays for them once
+
+INPUT_FILE = 'extracted2.xlsx'
+OUTPUT_FILE = 'extracted_new.xlsx'
+
+# Older extraction runs prefixed repeated column names with a counter, e.g.
+# "2 22 February 2022". Only a number in front of a full date is stripped:
+# in "2 January 2019" the number may be a day (a subfolder named "5 May 2020"
+# is 5 May), so it is parsed as one, as it always was.
+COUNTER_PREFIX = re.compile(r'^\d+\s+(?=\d{1,2}\s+[A-Za-z]+\s+\d{4}$)')
+
 def normalize_date(date_str):
     try:
-        # Handle the specific case of "2 22 February 2022"
-        if '22 February 2022' in date_str:
-            return datetime(2022, 2, 22)
+        date_str = COUNTER_PREFIX.sub('', date_str.strip())
         
         # Handle month and year format
         if len(date_str.split()) == 2:
@@ -17,6 +30,7 @@ def normalize_date(date_str):
                 pass  # If it's not a month name, continue to other parsing methods
         
         # Handle other date formats
+        from dateutil import parser
         date = parser.parse(date_str, dayfirst=False, yearfirst=False)
         
         # If day is not specified, set it to 1
@@ -29,6 +43,7 @@ def normalize_date(date_str):
         return None
 
 def normalize_capacity(value):
+    import pandas as pd
     if pd.isna(value):
         return None
     
@@ -61,6 +76,7 @@ def normalize_capacity(value):
             return None
 
 def infer_technology_type(row):
+    import pandas as pd
     if pd.isna(row['Technology Type']) or row['Technology Type'] == '':
         site_name = row['Site Name'].lower()
         if 'wind' in site_name:
@@ -71,52 +87,83 @@ def infer_technology_type(row):
             return 'Storage'
     return row['Technology Type']
 
-# Read the Excel file
-df = pd.read_excel('extracted2.xlsx')
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE, previous_df=None):
+    import pandas as pd
 
-# Normalize Nameplate Capacity
-df['Nameplate Capacity'] = df['Nameplate Capacity'].apply(normalize_capacity)
+    from capacity_cube import build_cube, cube_path, load_cube, refresh_cube, save_cube
+    from snapshots import NON_DATE_COLUMNS, normalise_snapshots, to_wide
+    from status_matrix import StatusMatrix, save_matrix
 
-# Remove rows where Nameplate Capacity is None (invalid or empty), but keep 'TBA', 'TBC', and 0 (zero capacity)
-df = df[df['Nameplate Capacity'].notna() | (df['Nameplate Capacity'].isin(['TBA', 'TBC', 0]))]
+    # Read the Excel file
+    original_df = pd.read_excel(input_file)
+    df = original_df.copy()
 
-# Infer Technology Type from Site Name if missing
-df['Technology Type'] = df.apply(infer_technology_type, axis=1)
+    # Normalize Nameplate Capacity
+    df['Nameplate Capacity'] = df['Nameplate Capacity'].apply(normalize_capacity)
 
-# List of date columns (excluding 'Region', 'Site Name', 'Technology Type', and 'Nameplate Capacity')
-non_date_columns = ['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity']
-date_columns = [col for col in df.columns if col not in non_date_columns]
+    # Remove rows where Nameplate Capacity is None (invalid or empty), but keep 'TBA', 'TBC', and 0 (zero capacity)
+    df = df[df['Nameplate Capacity'].notna() | (df['Nameplate Capacity'].isin(['TBA', 'TBC', 0]))]
 
-# Dictionary to store new column names and their corresponding dates
-new_column_names = {}
-column_dates = {}
+    # Infer Technology Type from Site Name if missing
+    df['Technology Type'] = df.apply(infer_technology_type, axis=1)
 
-# Normalize dates in column names
-for col in date_columns:
-    date = normalize_date(col)
-    if date:
-        new_name = date.strftime('%d-%m-%Y')
-        new_column_names[col] = new_name
-        column_dates[new_name] = date
-    else:
-        new_column_names[col] = col
-        column_dates[col] = datetime.max
-    print(f"Original: {col}, Normalized: {new_column_names[col]}")
+    # Melt the date columns into a long frame sorted by their normalised dates,
+    # then pivot back to the wide layout for the Excel output
+    long_df, snapshot_order = normalise_snapshots(df, normalize_date)
+    df = to_wide(df[NON_DATE_COLUMNS].reset_index(drop=True), long_df)
 
-# Rename the columns
-df = df.rename(columns=new_column_names)
+    # Write the result to a new Excel file
+    df.to_excel(output_file, index=False)
 
-# Sort date columns
-sorted_date_columns = sorted(new_column_names.values(), key=lambda x: column_dates[x])
+    # Precompute region x technology x status x snapshot totals next to the site table.
+    # Given the table this output was last built from, only the snapshots that
+    # changed are recomputed.
+    if previous_df is not None and os.path.exists(cube_path(output_file)):
+        cube = refresh_cube(load_cube(output_file), previous_df, df)
+    else:
+        cube = build_cube(df)
+    cube_file = save_cube(cube, output_file)
+    print(f"Capacity cube saved to '{cube_file}'")
+
+    # Status codes and capacities as site x snapshot arrays for trend queries
+    matrix_file = save_matrix(StatusMatrix.from_frame(df), output_file)
+    print(f"Status matrix saved to '{matrix_file}'")
 
-# Reorder columns
-final_column_order = non_date_columns + sorted_date_columns
-df = df[final_column_order]
+    inferred_types = ['Wind', 'Solar', 'Storage']
+    print(f"Date and Nameplate Capacity normalization completed. Technology Type inferred where missing. Invalid entries removed, zero capacity entries kept. Output saved to '{output_file}'.")
+    print(f"Number of rows in original file: {len(original_df)}")
+    print(f"Number of rows in new file: {len(df)}")
+    print(f"Number of Technology Types inferred: {sum(df['Technology Type'].isin(inferred_types)) - sum(original_df['Technology Type'].isin(inferred_types))}")
+    return df
 
-# Write the result to a new Excel file
-df.to_excel('extracted_new.xlsx', index=False)
+def serve(jobs=sys.stdin):
+    # Long-lived worker: one job per line, either "input output" file names or
+    # a JSON object with "input" and "output" keys. Imports happen on the
+    # first job only. Each job's result is reported on its own line.
+    for line in jobs:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            job = json.loads(line)
+            input_file, output_file = job.get('input', INPUT_FILE), job.get('output', OUTPUT_FILE)
+        else:
+            input_file, _, output_file = line.partition(' ')
+            output_file = output_file.strip() or OUTPUT_FILE
+        try:
+            main(input_file, output_file)
+            print(f"done {output_file}", flush=True)
+        except Exception as e:
+            print(f"failed {input_file}: {str(e)}", flush=True)
 
-print("Date and Nameplate Capacity normalization completed. Technology Type inferred where missing. Invalid entries removed, zero capacity entries kept. Output saved to 'extracted_new.xlsx'.")
-print(f"Number of rows in original file: {len(pd.read_excel('extracted2.xlsx'))}")
-print(f"Number of rows in new file: {len(df)}")
-print(f"Number of Technology Types inferred: {sum(df['Technology Type'].isin(['Wind', 'Solar', 'Storage'])) - sum(pd.read_excel('extracted2.xlsx')['Technology Type'].isin(['Wind', 'Solar', 'Storage']))}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalise dates and capacities in the merged extraction")
+    parser.add_argument('--input', default=INPUT_FILE, help="Output of full_automation_algo.py")
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--worker', action='store_true',
+                        help="Keep running and process one 'input output' job per line of standard input")
+    args = parser.parse_args()
+    if args.worker:
+        serve()
+    else:
+        main(args.input, args.output)
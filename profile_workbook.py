@@ -0,0 +1,136 @@
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from extractors import ALL_CATEGORIES, process_file
+
+# Buckets for self time, matched against the file each function lives in
+TIME_BUCKETS = [
+    ('openpyxl parsing', [f"{os.sep}openpyxl{os.sep}", f"{os.sep}xml{os.sep}", 'zipfile', 'et_xmlfile']),
+    ('pandas construction', [f"{os.sep}pandas{os.sep}", f"{os.sep}numpy{os.sep}"]),
+    ('extraction code', ['extractors.py', 'sections.py']),
+]
+
+# Functions whose cumulative time is reported as its own stage
+STAGES = [
+    ('whole workbook (extract_workbook)', ['extract_workbook']),
+    ('sheet reading (read_sheet/read_excel)', ['read_sheet', 'extract_single_sheet']),
+    ('process_sheet', ['process_sheet']),
+    ('capacity parsing (extract_max_capacity)', ['extract_max_capacity']),
+]
+
+def bucket_for(filename):
+    for bucket, patterns in TIME_BUCKETS:
+        if any(pattern in filename for pattern in patterns):
+            return bucket
+    return 'other'
+
+def summarise_profile(stats):
+    buckets = Counter()
+    stages = Counter()
+    for (filename, _, function_name), (_, _, self_time, cumulative_time, callers) in stats.stats.items():
+        if filename == '~':
+            # Built-ins have no file, so their time goes to whoever called them
+            for (caller_filename, _, _), (_, _, edge_time, _) in callers.items():
+                buckets[bucket_for(caller_filename)] += edge_time
+        else:
+            buckets[bucket_for(filename)] += self_time
+        for stage, function_names in STAGES:
+            # pstats cumulative time already covers every call of the function
+            if function_name in function_names and filename.endswith('extractors.py'):
+                stages[stage] = max(stages[stage], cumulative_time)
+    return buckets, stages
+
+def run_cprofile(file_path, status_column_name, categories, output_prefix, top):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    process_file(file_path, status_column_name, categories)
+    profiler.disable()
+
+    profile_file = f"{output_prefix}.prof"
+    profiler.dump_stats(profile_file)
+    stats = pstats.Stats(profiler)
+    buckets, stages = summarise_profile(stats)
+    total = sum(buckets.values())
+
+    print("\nSelf time by component:")
+    for bucket, seconds in buckets.most_common():
+        print(f"  {bucket:<40} {seconds:8.3f} s {100 * seconds / total:6.1f} %")
+
+    print("\nCumulative time by stage:")
+    for stage, _ in STAGES:
+        print(f"  {stage:<40} {stages[stage]:8.3f} s")
+
+    print(f"\nTop {top} hotspots by self time:")
+    stats.sort_stats('tottime').print_stats(top)
+    print(f"cProfile data saved to '{profile_file}'")
+
+class StackSampler:
+    # Samples the stack of one thread at a fixed interval and counts each
+    # distinct stack, for flamegraph.pl or speedscope's folded-stack format
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, output_file):
+        with open(output_file, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+def run_sampler(file_path, status_column_name, categories, output_prefix, interval):
+    start = time.perf_counter()
+    with StackSampler(threading.get_ident(), interval) as sampler:
+        process_file(file_path, status_column_name, categories)
+    elapsed = time.perf_counter() - start
+
+    folded_file = f"{output_prefix}.folded"
+    sampler.write_folded(folded_file)
+    print(f"\nSampled {sum(sampler.samples.values())} stacks over {elapsed:.2f} s (unprofiled run)")
+    print(f"Folded stacks saved to '{folded_file}' (flamegraph.pl {folded_file} > flamegraph.svg)")
+
+def main(file_path, status_column_name=None, categories=ALL_CATEGORIES, output_prefix=None, top=25,
+         interval=0.001):
+    status_column_name = status_column_name or os.path.splitext(os.path.basename(file_path))[0]
+    output_prefix = output_prefix or os.path.splitext(os.path.basename(file_path))[0]
+    run_cprofile(file_path, status_column_name, categories, output_prefix, top)
+    run_sampler(file_path, status_column_name, categories, output_prefix, interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile process_file on a single workbook")
+    parser.add_argument('file_path', help="Workbook to profile")
+    parser.add_argument('--status-column', help="Status column name (defaults to the file name)")
+    parser.add_argument('--categories', nargs='+', choices=sorted(ALL_CATEGORIES), default=sorted(ALL_CATEGORIES),
+                        help="Sheet categories to extract")
+    parser.add_argument('--output-prefix', help="Prefix for the .prof and .folded outputs")
+    parser.add_argument('--top', type=int, default=25, help="Number of hotspots to list")
+    parser.add_argument('--interval', type=float, default=0.001, help="Sampling interval in seconds")
+    args = parser.parse_args()
+    main(args.file_path, args.status_column, set(args.categories), args.output_prefix, args.top, args.interval)
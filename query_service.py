@@ -0,0 +1,138 @@
+import argparse
+import json
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from snapshots import snapshot_columns
+
+class GenerationStore:
+    # Read-only, in-memory copy of the merged generation information with
+    # row-position indexes on region, technology, site and per-snapshot status,
+    # plus the rows present (with a non-blank status) in each snapshot
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.snapshots = snapshot_columns(self.df)
+        self.capacity = pd.to_numeric(self.df['Nameplate Capacity'], errors='coerce').fillna(0).to_numpy()
+
+        self.region_index = self._index(self.df['Region'])
+        self.technology_index = self._index(self.df['Technology Type'])
+        self.site_index = self._index(self.df['Site Name'])
+        self.status_index = {snapshot: self._index(self.df[snapshot]) for snapshot in self.snapshots}
+        self.present_index = {snapshot: self._present(self.df[snapshot]) for snapshot in self.snapshots}
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_excel(path))
+
+    @staticmethod
+    def _index(column):
+        return {key: np.asarray(positions) for key, positions in column.groupby(column, sort=False).indices.items()}
+
+    @staticmethod
+    def _present(column):
+        blank = column.isna() | (column.astype(str).str.strip() == '')
+        return np.flatnonzero(~blank.to_numpy())
+
+    def _positions(self, region=None, technology=None, status=None, snapshot=None):
+        # Only sites listed in the snapshot count towards it
+        positions = self.present_index[snapshot]
+        lookups = [(self.region_index, region), (self.technology_index, technology)]
+        if status is not None:
+            lookups.append((self.status_index[snapshot], status))
+        for index, key in lookups:
+            if key is None:
+                continue
+            matches = index.get(key, np.empty(0, dtype=int))
+            positions = np.intersect1d(positions, matches, assume_unique=True)
+        return positions
+
+    def capacity_total(self, region=None, technology=None, status=None, snapshot=None):
+        if not self.snapshots:
+            raise KeyError("No snapshots loaded")
+        snapshot = snapshot or self.snapshots[-1]
+        if snapshot not in self.status_index:
+            raise KeyError(f"Unknown snapshot '{snapshot}'")
+        positions = self._positions(region, technology, status, snapshot)
+        return {
+            'snapshot': snapshot,
+            'sites': int(len(positions)),
+            'capacity': round(float(self.capacity[positions].sum()), 2)
+        }
+
+    def capacity_history(self, region=None, technology=None, status=None):
+        return [self.capacity_total(region, technology, status, snapshot) for snapshot in self.snapshots]
+
+    def site_history(self, site_name):
+        if site_name not in self.site_index:
+            raise KeyError(f"Unknown site '{site_name}'")
+        history = []
+        for position in self.site_index[site_name]:
+            row = self.df.iloc[position]
+            history.append({
+                'region': row['Region'],
+                'technology': None if pd.isna(row['Technology Type']) else row['Technology Type'],
+                'capacity': None if pd.isna(row['Nameplate Capacity']) else row['Nameplate Capacity'],
+                'statuses': {snapshot: row[snapshot] for snapshot in self.snapshots if not pd.isna(row[snapshot])}
+            })
+        return history
+
+def make_handler(store, cache_size=1024):
+    @lru_cache(maxsize=cache_size)
+    def answer(path, query):
+        params = dict(query)
+        filters = {key: params.get(key) for key in ['region', 'technology', 'status']}
+        if path == '/snapshots':
+            return store.snapshots
+        if path == '/capacity':
+            return store.capacity_total(snapshot=params.get('snapshot'), **filters)
+        if path == '/capacity/history':
+            return store.capacity_history(**filters)
+        if path == '/site':
+            return store.site_history(params.get('name'))
+        raise KeyError(f"Unknown endpoint '{path}'")
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = tuple(sorted(parse_qsl(url.query)))
+            try:
+                status, body = 200, answer(url.path, query)
+            except KeyError as e:
+                status, body = 404, {'error': str(e.args[0])}
+            except (TypeError, ValueError) as e:
+                status, body = 400, {'error': str(e)}
+
+            payload = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return QueryHandler
+
+def main(data_file, host, port):
+    print(f"Loading '{data_file}'...")
+    store = GenerationStore.load(data_file)
+    print(f"Loaded {len(store.df)} sites across {len(store.snapshots)} snapshots")
+
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    print(f"Serving on http://{host}:{port} (endpoints: /snapshots, /capacity, /capacity/history, /site)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only JSON query service over the merged generation information")
+    parser.add_argument('--data', default='extracted_new.xlsx', help="Normalised output of preprocessing.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    main(args.data, args.host, args.port)
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from lookups import HEADER_ALIASES
+
+# Header rows that split a sheet into sections. Every data row below a
+# marker belongs to that marker's section until the next marker.
+SECTION_MARKERS = ['Committed', 'Anticipated', 'Proposed', 'Publicly Announced', 'Withdrawn']
+
+SITE_NAME_COLUMNS = HEADER_ALIASES['Site Name']
+
+def site_name_series(df):
+    column = next((name for name in SITE_NAME_COLUMNS if name in df.columns), None)
+    if column is None:
+        return pd.Series(None, index=df.index, dtype=object)
+    return df[column]
+
+def find_section_markers(names, markers=SECTION_MARKERS):
+    if not (pd.api.types.is_object_dtype(names) or pd.api.types.is_string_dtype(names)):
+        return pd.Series(False, index=names.index)
+    return names.str.strip().isin(markers)
+
+def assign_sections(names, default, markers=SECTION_MARKERS):
+    # One vectorized pass: keep the marker text on marker rows, forward-fill
+    # it down to the data rows and use the default above the first marker
+    is_marker = find_section_markers(names, markers)
+    if not is_marker.any():
+        return pd.Series(default, index=names.index, dtype=object), is_marker
+    sections = names.where(is_marker).str.strip().ffill().fillna(default)
+    return sections, is_marker
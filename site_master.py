@@ -0,0 +1,113 @@
+import math
+import sqlite3
+
+import pandas as pd
+
+# site master column -> combined frame column
+SITE_COLUMN_NAMES = {
+    'site_name': 'Site Name',
+    'region': 'Region',
+    'technology': 'Technology Type',
+    'capacity': 'Nameplate Capacity'
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sites (
+    site_id INTEGER PRIMARY KEY,
+    site_name TEXT NOT NULL UNIQUE,
+    region TEXT,
+    technology TEXT,
+    capacity
+);
+CREATE INDEX IF NOT EXISTS sites_region ON sites (region, technology);
+
+CREATE TABLE IF NOT EXISTS site_history (
+    site_id INTEGER NOT NULL REFERENCES sites (site_id),
+    snapshot TEXT NOT NULL,
+    technology TEXT,
+    capacity,
+    status TEXT,
+    PRIMARY KEY (site_id, snapshot)
+);
+CREATE INDEX IF NOT EXISTS site_history_snapshot ON site_history (snapshot);
+'''
+
+# The region of a site is fixed when it is first seen, while technology and
+# capacity follow the latest release, as in merge_data
+UPSERT_SITE = '''
+INSERT INTO sites (site_name, region, technology, capacity) VALUES (?, ?, ?, ?)
+ON CONFLICT (site_name) DO UPDATE SET technology = excluded.technology, capacity = excluded.capacity
+'''
+
+UPSERT_HISTORY = '''
+INSERT INTO site_history (site_id, snapshot, technology, capacity, status)
+SELECT site_id, ?, ?, ?, ? FROM sites WHERE site_name = ?
+ON CONFLICT (site_id, snapshot) DO UPDATE SET
+    technology = excluded.technology, capacity = excluded.capacity, status = excluded.status
+'''
+
+def sql_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if value == '':
+        return None
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+class SiteMaster:
+    # Persistent table of sites with stable integer ids plus their per-snapshot
+    # technology, capacity and status history
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_workbook(self, df, snapshot):
+        # One transaction per workbook: upsert its sites, then its history rows
+        if df.empty or 'Site Name' not in df.columns:
+            return 0
+
+        columns = [df[column] if column in df.columns else [None] * len(df)
+                   for column in ['Site Name', 'Region', 'Technology Type', 'Nameplate Capacity', snapshot]]
+        rows = [tuple(sql_value(value) for value in row) for row in zip(*columns)]
+        rows = [row for row in rows if row[0] is not None]
+
+        with self.conn:
+            self.conn.executemany(UPSERT_SITE, [row[:4] for row in rows])
+            self.conn.executemany(UPSERT_HISTORY, [(snapshot, technology, capacity, status, site_name)
+                                                   for site_name, _, technology, capacity, status in rows])
+        return len(rows)
+
+    def site_ids(self):
+        return dict(self.conn.execute("SELECT site_name, site_id FROM sites"))
+
+    def sites(self):
+        return pd.read_sql("SELECT * FROM sites ORDER BY site_id", self.conn, index_col='site_id')
+
+    def history(self, site_id=None):
+        if site_id is None:
+            return pd.read_sql("SELECT * FROM site_history ORDER BY rowid", self.conn)
+        return pd.read_sql("SELECT * FROM site_history WHERE site_id = ? ORDER BY rowid", self.conn,
+                           params=(site_id,))
+
+    def wide_frame(self):
+        # Same layout as the combined frame built by full_automation_algo.main
+        sites = self.sites()
+        history = self.history()
+        statuses = history.pivot(index='site_id', columns='snapshot', values='status')
+        statuses = statuses[list(dict.fromkeys(history['snapshot']))]
+
+        wide = sites.rename(columns=SITE_COLUMN_NAMES)[['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity']]
+        wide = wide.join(statuses)
+        wide.columns.name = None
+        return wide.reset_index(drop=True)
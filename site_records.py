@@ -0,0 +1,103 @@
+import math
+import sys
+
+import pandas as pd
+
+RECORD_COLUMNS = ['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity']
+
+# Code used for a missing (NaN/None) label in any code table
+MISSING_CODE = -1
+
+class CodeTable:
+    # Two-way mapping between labels and small integer codes. Labels not
+    # seen before are appended, so codes stay stable for the whole run.
+    # String labels are interned, so every frame decoded from a table shares
+    # one string object per distinct label.
+    __slots__ = ('labels', 'codes')
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self.codes = {}
+        for label in labels:
+            self.encode(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def encode(self, label):
+        if label is None or (isinstance(label, float) and math.isnan(label)):
+            return MISSING_CODE
+        code = self.codes.get(label)
+        if code is None:
+            if isinstance(label, str):
+                label = sys.intern(label)
+            code = len(self.labels)
+            self.codes[label] = code
+            self.labels.append(label)
+        return code
+
+    def encode_many(self, labels):
+        return [self.encode(label) for label in labels]
+
+    def decode(self, code):
+        if code == MISSING_CODE:
+            return None
+        return self.labels[code]
+
+# These tables live for the whole process and are shared by every
+# process_file call, so each distinct site name or label is stored once.
+REGION_CODES = CodeTable(['NSW1', 'QLD1', 'SA1', 'TAS1', 'VIC1'])
+SITE_NAMES = CodeTable()
+TECHNOLOGY_CODES = CodeTable()
+STATUS_CODES = CodeTable(['In Service', 'Committed', 'Publicly Announced'])
+
+def encode_capacity(value):
+    # Numeric capacities become floats; labels such as 'TBA' are kept as-is
+    # so the preprocessing step can still recognise them.
+    if value is None or value == '':
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+class SiteRecord:
+    __slots__ = ('region', 'site_key', 'technology', 'capacity', 'status')
+
+    def __init__(self, region, site_key, technology, capacity, status):
+        self.region = region
+        self.site_key = site_key
+        self.technology = technology
+        self.capacity = capacity
+        self.status = status
+
+    def __repr__(self):
+        return (f"SiteRecord({REGION_CODES.decode(self.region)!r}, {SITE_NAMES.decode(self.site_key)!r}, "
+                f"{TECHNOLOGY_CODES.decode(self.technology)!r}, {self.capacity!r}, "
+                f"{STATUS_CODES.decode(self.status)!r})")
+
+    def to_row(self, status_column_name):
+        capacity = self.capacity
+        if isinstance(capacity, float) and math.isnan(capacity):
+            capacity = ''
+        return {
+            'Region': REGION_CODES.decode(self.region),
+            'Site Name': SITE_NAMES.decode(self.site_key),
+            'Technology Type': TECHNOLOGY_CODES.decode(self.technology),
+            'Nameplate Capacity': capacity,
+            status_column_name: STATUS_CODES.decode(self.status)
+        }
+
+def records_from_frame(df, status_column_name):
+    if df.empty:
+        return []
+    columns = [df[column] if column in df.columns else [None] * len(df)
+               for column in RECORD_COLUMNS + [status_column_name]]
+    return [
+        SiteRecord(REGION_CODES.encode(region), SITE_NAMES.encode(site_name), TECHNOLOGY_CODES.encode(technology),
+                   encode_capacity(capacity), STATUS_CODES.encode(status))
+        for region, site_name, technology, capacity, status in zip(*columns)
+    ]
+
+def records_to_frame(records, status_column_name):
+    return pd.DataFrame([record.to_row(status_column_name) for record in records],
+                        columns=RECORD_COLUMNS + [status_column_name])
@@ -0,0 +1,125 @@
+import argparse
+import sqlite3
+
+import pandas as pd
+
+from site_master import SCHEMA as SITE_SCHEMA, sql_value
+from snapshots import snapshot_dates, to_long
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS observations (
+    site_id INTEGER NOT NULL,
+    region TEXT,
+    technology TEXT,
+    snapshot_date TEXT NOT NULL,
+    capacity REAL,
+    status TEXT
+);
+'''
+
+# Both indexes carry every column the trend and history queries read, so
+# those queries never have to touch the table itself
+INDEXES = '''
+CREATE INDEX IF NOT EXISTS observations_trend
+    ON observations (region, technology, snapshot_date, status, capacity, site_id);
+CREATE INDEX IF NOT EXISTS observations_site
+    ON observations (site_id, snapshot_date, status, capacity, region, technology);
+'''
+
+INDEX_NAMES = ['observations_trend', 'observations_site']
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SITE_SCHEMA)
+    conn.executescript(SCHEMA)
+    conn.executescript(INDEXES)
+    return conn
+
+def assign_site_ids(conn, long_df):
+    # Site ids come from the site master table in the same database, so ids
+    # stay stable across exports; sites it has not seen yet are added to it
+    sites = long_df.drop_duplicates('Site Name')
+    conn.executemany(
+        "INSERT OR IGNORE INTO sites (site_name, region, technology, capacity) VALUES (?, ?, ?, ?)",
+        [tuple(sql_value(value) for value in row)
+         for row in zip(sites['Site Name'], sites['Region'], sites['Technology Type'], sites['Nameplate Capacity'])])
+    site_ids = dict(conn.execute("SELECT site_name, site_id FROM sites"))
+    return long_df['Site Name'].map(site_ids)
+
+def export_observations(db_path, df):
+    # Replace the observations table with the long form of a normalised wide
+    # table (the output of preprocessing.py). Indexes are dropped during the
+    # bulk insert and rebuilt once afterwards.
+    long_df = to_long(df)
+    long_df = long_df[long_df['Site Name'].notna()]
+    dates = snapshot_dates(long_df['Snapshot'].unique())
+    date_lookup = dict(zip(long_df['Snapshot'].unique(), dates.strftime('%Y-%m-%d')))
+    long_df = long_df.assign(snapshot_date=long_df['Snapshot'].map(date_lookup))
+    long_df = long_df[long_df['snapshot_date'].notna()]
+    capacities = pd.to_numeric(long_df['Nameplate Capacity'], errors='coerce')
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            site_ids = assign_site_ids(conn, long_df)
+            for index_name in INDEX_NAMES:
+                conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+            conn.execute("DELETE FROM observations")
+            conn.executemany(
+                "INSERT INTO observations (site_id, region, technology, snapshot_date, capacity, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(sql_value(value) for value in row)
+                 for row in zip(site_ids, long_df['Region'], long_df['Technology Type'],
+                                long_df['snapshot_date'], capacities, long_df['Status'])])
+        conn.executescript(INDEXES)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return len(long_df)
+
+def query(db_path, sql, params=()):
+    conn = connect(db_path)
+    try:
+        return pd.read_sql(sql, conn, params=params)
+    finally:
+        conn.close()
+
+def capacity_trend(db_path, region=None, technology=None, status=None, start=None, end=None):
+    # Capacity and site count per snapshot date for the given filters, e.g.
+    # capacity_trend(db, 'QLD1', 'Solar PV', 'Committed', '2020-01-01')
+    conditions, params = [], []
+    for column, value in [('region', region), ('technology', technology), ('status', status)]:
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if start is not None:
+        conditions.append("snapshot_date >= ?")
+        params.append(str(pd.Timestamp(start).date()))
+    if end is not None:
+        conditions.append("snapshot_date <= ?")
+        params.append(str(pd.Timestamp(end).date()))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    df = query(db_path, f"SELECT snapshot_date, SUM(capacity) AS capacity, COUNT(*) AS sites "
+                        f"FROM observations {where} GROUP BY snapshot_date ORDER BY snapshot_date", params)
+    df['snapshot_date'] = pd.to_datetime(df['snapshot_date'])
+    return df
+
+def site_history(db_path, site_id):
+    df = query(db_path, "SELECT snapshot_date, status, capacity, region, technology FROM observations "
+                        "WHERE site_id = ? ORDER BY snapshot_date", (site_id,))
+    df['snapshot_date'] = pd.to_datetime(df['snapshot_date'])
+    return df
+
+def find_sites(db_path, name_pattern):
+    return query(db_path, "SELECT * FROM sites WHERE site_name LIKE ? ORDER BY site_name", (name_pattern,))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the normalised snapshot history into SQLite")
+    parser.add_argument('--input', default='extracted_new.xlsx', help="Normalised output of preprocessing.py")
+    parser.add_argument('--db', default='generation_history.db')
+    args = parser.parse_args()
+
+    rows = export_observations(args.db, pd.read_excel(args.input))
+    print(f"Loaded {rows} observations into '{args.db}'")
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+NON_DATE_COLUMNS = ['Region', 'Site Name', 'Technology Type', 'Nameplate Capacity']
+
+# Snapshot columns are renamed to this format by preprocessing.py
+SNAPSHOT_DATE_FORMAT = '%d-%m-%Y'
+
+def snapshot_columns(df):
+    return [column for column in df.columns if column not in NON_DATE_COLUMNS]
+
+def snapshot_dates(columns):
+    # Columns that are not normalised dates become NaT
+    return pd.to_datetime(pd.Index(columns, dtype=object), format=SNAPSHOT_DATE_FORMAT, errors='coerce')
+
+def to_long(df, columns=None):
+    # One row per site and snapshot in which the site has a status
+    columns = snapshot_columns(df) if columns is None else columns
+    id_columns = [column for column in NON_DATE_COLUMNS if column in df.columns]
+    long_df = df.melt(id_vars=id_columns, value_vars=columns, var_name='Snapshot', value_name='Status')
+    long_df = long_df[long_df['Status'].notna() & (long_df['Status'] != '')]
+    return long_df.reset_index(drop=True)
+
+def dated_snapshot_columns(df):
+    # Snapshot columns with a parseable date, in date order, and their dates
+    columns = snapshot_columns(df)
+    dates = snapshot_dates(columns)
+    order = [position for position in dates.argsort() if not pd.isna(dates[position])]
+    return [columns[position] for position in order], dates[order]
+
+def encode_statuses(df, columns):
+    # site x snapshot matrix of integer status codes (-1 where blank) and the
+    # status label for each code
+    values = df[columns].to_numpy(dtype=object)
+    values[pd.isna(values) | (values == '')] = None
+    codes, labels = pd.factorize(values.ravel())
+    return codes.reshape(values.shape), list(labels)
+
+def normalise_snapshots(df, parse_date):
+    # Long form of the snapshot columns: one row per site position and
+    # snapshot with a status, sorted by snapshot date. Each column name is
+    # parsed once; columns that do not parse keep their name, get NaT and sort
+    # last. Returns the long frame and the snapshot names in date order.
+    columns = snapshot_columns(df)
+    parsed = [parse_date(column) for column in columns]
+    names = [date.strftime(SNAPSHOT_DATE_FORMAT) if date else column for column, date in zip(columns, parsed)]
+    dates = pd.DatetimeIndex([date if date else pd.NaT for date in parsed])
+    for column, name in zip(columns, names):
+        print(f"Original: {column}, Normalized: {name}")
+
+    # Rank of every column in date order, so sorting the long frame is an
+    # integer sort rather than a date or string comparison
+    order = np.argsort(np.where(dates.isna(), np.iinfo(np.int64).max, dates.asi8), kind='stable')
+    ranks = np.empty(len(columns), dtype=np.int64)
+    ranks[order] = np.arange(len(columns))
+
+    values = df[columns].to_numpy(dtype=object).ravel()
+    site_positions = np.repeat(np.arange(len(df)), len(columns))
+    snapshot_ranks = np.tile(ranks, len(df))
+    keep = ~pd.isna(values) & (values != '')
+    site_positions, snapshot_ranks, values = site_positions[keep], snapshot_ranks[keep], values[keep]
+    sort = np.argsort(snapshot_ranks, kind='stable')
+
+    snapshot_order = list(dict.fromkeys(names[position] for position in order))
+    snapshot_codes = pd.Index(snapshot_order).get_indexer([names[position] for position in order])
+    long_df = pd.DataFrame({
+        'Site Position': site_positions[sort],
+        'Snapshot': pd.Categorical.from_codes(snapshot_codes[snapshot_ranks[sort]], snapshot_order),
+        'Date': dates[order][snapshot_ranks[sort]],
+        'Status': values[sort]
+    })
+    return long_df, snapshot_order
+
+def to_wide(sites, long_df):
+    # Site columns plus one status column per snapshot, in the long frame's
+    # snapshot order. Where two columns normalised to the same snapshot, the
+    # earlier column's status wins.
+    long_df = long_df.drop_duplicates(['Site Position', 'Snapshot'])
+    snapshots = long_df['Snapshot'].cat.categories
+    statuses = np.full((len(sites), len(snapshots)), np.nan, dtype=object)
+    statuses[long_df['Site Position'].to_numpy(), long_df['Snapshot'].cat.codes.to_numpy()] = long_df['Status'].to_numpy()
+    status_df = pd.DataFrame(statuses, columns=snapshots, index=sites.index)
+    return pd.concat([sites, status_df], axis=1)
@@ -0,0 +1,252 @@
+import csv
+import heapq
+import itertools
+import json
+import os
+import pickle
+import sqlite3
+
+from openpyxl import Workbook
+
+from excel_export import EXCEL_MAX_COLUMNS, KEY_COLUMNS, clean_cell, column_chunks
+from extractors import ALL_CATEGORIES, process_file
+from site_master import SiteMaster
+from site_records import RECORD_COLUMNS, records_from_frame
+
+# Out-of-core merge: every extracted workbook is spilled to disk as one file
+# per region, sorted by site key, and the wide (or long) output is built by a
+# streaming k-way merge of those files. Memory use depends on the number of
+# open spill files and the chunk size, not on the length of the archive.
+
+# Spill directory inside the cache directory
+SPILL_DIR = 'spill'
+
+MANIFEST_FILE = 'manifest.json'
+
+# Records per pickled chunk in a spill file
+SPILL_CHUNK_SIZE = 5000
+
+# Most spill files merged at once; larger partitions are compacted first
+MERGE_FAN_IN = 64
+
+# Rows per executemany batch when writing SQLite output
+SQLITE_BATCH_SIZE = 10000
+
+UNKNOWN_PARTITION = 'Unknown'
+
+def spill_record(sequence, row_number, row, column_index):
+    # (sort key, workbook sequence, row number, region, site name, technology,
+    # capacity, status column index, status). Rows without a site name never
+    # match another row in merge_data, so each gets a key of its own.
+    region, site_name, technology, capacity, status = row
+    sort_key = (1, sequence, row_number) if site_name is None else (0, str(site_name))
+    return (sort_key, sequence, row_number, region, site_name, technology, capacity, column_index, status)
+
+def write_spill_file(path, records):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        for start in range(0, len(records), SPILL_CHUNK_SIZE):
+            pickle.dump(records[start:start + SPILL_CHUNK_SIZE], f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+def read_spill_file(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+def spill_file_sequence(file_name):
+    return int(file_name.split('.')[0].split('-')[0])
+
+def partition_dirs(spill_dir):
+    return sorted(entry.path for entry in os.scandir(spill_dir) if entry.is_dir())
+
+def spill_files(partition_dir):
+    return sorted(os.path.join(partition_dir, name) for name in os.listdir(partition_dir) if name.endswith('.pkl'))
+
+def load_manifest(spill_dir):
+    path = os.path.join(spill_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(spill_dir, manifest):
+    path = os.path.join(spill_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(manifest, f)
+    os.replace(f"{path}.tmp", path)
+
+def clear_spills(spill_dir, from_sequence=0):
+    # Only removes spill files (and then empty partition folders), so a spill
+    # directory pointed at an existing folder loses nothing else
+    for partition_dir in partition_dirs(spill_dir):
+        for path in spill_files(partition_dir):
+            if spill_file_sequence(os.path.basename(path)) >= from_sequence:
+                os.remove(path)
+        if not os.listdir(partition_dir):
+            os.rmdir(partition_dir)
+
+def spill_workbook(spill_dir, sequence, processed_data, status_column_name, column_index):
+    partitions = {}
+    for row_number, record in enumerate(records_from_frame(processed_data, status_column_name)):
+        row = record.to_row(status_column_name)
+        row = tuple(row[column] for column in RECORD_COLUMNS + [status_column_name])
+        partitions.setdefault(row[0] or UNKNOWN_PARTITION, []).append(
+            spill_record(sequence, row_number, row, column_index))
+
+    for region, records in partitions.items():
+        partition_dir = os.path.join(spill_dir, region)
+        os.makedirs(partition_dir, exist_ok=True)
+        records.sort(key=lambda record: record[:3])
+        write_spill_file(os.path.join(partition_dir, f"{sequence:06d}.pkl"), records)
+
+def spill_workbooks(workbooks, spill_dir, categories=ALL_CATEGORIES, resume=False, site_master_path=None):
+    # Extract every workbook once and spill it; the manifest records the
+    # snapshot columns and finished workbooks, so a run can be resumed
+    os.makedirs(spill_dir, exist_ok=True)
+    manifest = load_manifest(spill_dir) if resume else None
+    if manifest:
+        print(f"Resuming from '{spill_dir}': {len(manifest['completed'])} workbooks already spilled")
+        clear_spills(spill_dir, manifest['next_sequence'])
+    else:
+        clear_spills(spill_dir)
+        manifest = {'columns': [], 'completed': [], 'next_sequence': 0}
+
+    site_master = SiteMaster(site_master_path) if site_master_path else None
+    already_spilled = set(manifest['completed'])
+    try:
+        for file_path, status_column_name in workbooks:
+            if file_path in already_spilled:
+                continue
+
+            added_column = status_column_name not in manifest['columns']
+            try:
+                processed_data = process_file(file_path, status_column_name, categories)
+                if added_column:
+                    manifest['columns'].append(status_column_name)
+                spill_workbook(spill_dir, manifest['next_sequence'], processed_data, status_column_name,
+                               manifest['columns'].index(status_column_name))
+                if site_master:
+                    site_master.upsert_workbook(processed_data, status_column_name)
+            except Exception as e:
+                print(f"Error processing file {os.path.basename(file_path)}: {str(e)}")
+                # Undo whatever part of the workbook was spilled, so the next
+                # workbook starts from a clean sequence number
+                clear_spills(spill_dir, manifest['next_sequence'])
+                if added_column and status_column_name in manifest['columns']:
+                    manifest['columns'].remove(status_column_name)
+                continue
+
+            manifest['next_sequence'] += 1
+            manifest['completed'].append(file_path)
+            save_manifest(spill_dir, manifest)
+    finally:
+        if site_master:
+            site_master.close()
+
+    return manifest['columns']
+
+def compact_partition(partition_dir):
+    # Merge groups of spill files until one k-way merge can read them all;
+    # records keep their sequence and row numbers, so the final merge is
+    # unaffected by how files were combined
+    files = spill_files(partition_dir)
+    while len(files) > MERGE_FAN_IN:
+        group, files = files[:MERGE_FAN_IN], files[MERGE_FAN_IN:]
+        sequences = [int(part) for path in group for part in os.path.basename(path).split('.')[0].split('-')]
+        merged_path = os.path.join(partition_dir, f"{min(sequences):06d}-{max(sequences):06d}.pkl")
+        records = heapq.merge(*[read_spill_file(path) for path in group], key=lambda record: record[:3])
+        temp_path = f"{merged_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            while True:
+                chunk = list(itertools.islice(records, SPILL_CHUNK_SIZE))
+                if not chunk:
+                    break
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for path in group:
+            os.remove(path)
+        os.replace(temp_path, merged_path)
+        files.append(merged_path)
+    return sorted(files)
+
+def merged_sites(spill_dir, column_count, regions=None):
+    # Yields one wide row per site: the region it was first seen with, the
+    # latest technology and capacity, and the latest status in each snapshot
+    # column, as merge_data would produce
+    for partition_dir in partition_dirs(spill_dir):
+        if regions and os.path.basename(partition_dir) not in regions:
+            continue
+        records = heapq.merge(*[read_spill_file(path) for path in compact_partition(partition_dir)],
+                              key=lambda record: record[:3])
+        for _, site_records in itertools.groupby(records, key=lambda record: record[0]):
+            first = next(site_records)
+            region, site_name, technology, capacity = first[3:7]
+            statuses = [None] * column_count
+            statuses[first[7]] = first[8]
+            for record in site_records:
+                technology, capacity = record[5], record[6]
+                statuses[record[7]] = record[8]
+            yield [region, site_name, technology, capacity] + statuses
+
+def output_rows(spill_dir, columns, kept_columns, regions=None, layout='wide'):
+    positions = [columns.index(column) for column in kept_columns]
+    for row in merged_sites(spill_dir, len(columns), regions):
+        statuses = [row[4 + position] for position in positions]
+        if layout == 'long':
+            for column, status in zip(kept_columns, statuses):
+                if status is not None and status != '':
+                    yield row[:4] + [column, status]
+        else:
+            yield row[:4] + statuses
+
+def write_merged(spill_dir, columns, output_file, output_format='xlsx', kept_columns=None, regions=None,
+                 layout='wide'):
+    # Streams the merged rows straight into the output file and returns the
+    # number of rows written
+    kept_columns = columns if kept_columns is None else kept_columns
+    header = RECORD_COLUMNS + (['Snapshot', 'Status'] if layout == 'long' else list(kept_columns))
+
+    def rows():
+        return output_rows(spill_dir, columns, kept_columns, regions, layout)
+
+    row_count = 0
+    if output_format == 'csv':
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for row in rows():
+                writer.writerow(row)
+                row_count += 1
+    elif output_format == 'sqlite':
+        with sqlite3.connect(output_file) as conn:
+            quoted = ', '.join('"' + column.replace('"', '""') + '"' for column in header)
+            conn.execute("DROP TABLE IF EXISTS combined")
+            conn.execute(f"CREATE TABLE combined ({quoted})")
+            insert = f"INSERT INTO combined VALUES ({', '.join('?' * len(header))})"
+            row_iterator = rows()
+            while True:
+                batch = list(itertools.islice(row_iterator, SQLITE_BATCH_SIZE))
+                if not batch:
+                    break
+                conn.executemany(insert, [[None if value == '' else value for value in row] for row in batch])
+                row_count += len(batch)
+    elif output_format == 'xlsx':
+        # As in write_excel, snapshot columns beyond Excel's width go on extra
+        # sheets; each sheet is a separate pass over the spill files
+        workbook = Workbook(write_only=True)
+        for sheet_number, sheet_columns in enumerate(column_chunks(header, KEY_COLUMNS, EXCEL_MAX_COLUMNS), start=1):
+            worksheet = workbook.create_sheet(f"Sheet{sheet_number}")
+            worksheet.append([str(column) for column in sheet_columns])
+            positions = [header.index(column) for column in sheet_columns]
+            row_count = 0
+            for row in rows():
+                worksheet.append([clean_cell(row[position]) for position in positions])
+                row_count += 1
+        workbook.save(output_file)
+    else:
+        raise ValueError(f"Output format '{output_format}' cannot be streamed; use xlsx, csv or sqlite")
+    return row_count
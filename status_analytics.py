@@ -0,0 +1,151 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from snapshots import dated_snapshot_columns
+from status_matrix import StatusMatrix
+
+IN_SERVICE = 'In Service'
+
+# Order in which a project normally moves through the development pipeline
+PIPELINE_STAGES = ['Publicly Announced', 'Committed', IN_SERVICE]
+
+# Points (in days) at which survival summaries report the share of projects
+# still waiting to reach service
+SURVIVAL_HORIZONS = [365, 730, 1095, 1825]
+
+def status_runs(codes, dates):
+    # Run-length encode each site's status sequence over the date-sorted
+    # snapshots. A blank snapshot ends a run, and runs of blanks are dropped.
+    sites, snapshots = codes.shape
+    starts = np.ones(codes.shape, dtype=bool)
+    starts[:, 1:] = codes[:, 1:] != codes[:, :-1]
+
+    run_starts = np.flatnonzero(starts.ravel())
+    # Every row starts with a run, so the next run start is always the first
+    # snapshot after the current run's last one
+    run_ends = np.append(run_starts[1:], sites * snapshots) - 1
+    site_positions = run_starts // snapshots
+    start_columns = run_starts % snapshots
+    end_columns = run_ends % snapshots
+    status_codes = codes.ravel()[run_starts]
+
+    keep = status_codes != -1
+    site_positions, start_columns, end_columns, status_codes = (
+        site_positions[keep], start_columns[keep], end_columns[keep], status_codes[keep])
+
+    # A run lasts until the next snapshot; runs that reach the latest
+    # snapshot have not ended yet and are censored
+    censored = end_columns == snapshots - 1
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    next_dates = dates[np.minimum(end_columns + 1, snapshots - 1)]
+    days = (next_dates - dates[start_columns]).astype('timedelta64[D]').astype(float)
+
+    return pd.DataFrame({
+        'Site Position': site_positions,
+        'Status Code': status_codes,
+        'Start': dates[start_columns],
+        'End': dates[end_columns],
+        'Snapshots': end_columns - start_columns + 1,
+        'Days': days,
+        'Censored': censored
+    })
+
+def first_seen(codes, dates, labels):
+    # Date each site was first observed in each status (NaT if never)
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    result = {}
+    for code, label in enumerate(labels):
+        mask = codes == code
+        seen = mask.any(axis=1)
+        result[label] = np.where(seen, dates[mask.argmax(axis=1)], np.datetime64('NaT'))
+    return pd.DataFrame(result)
+
+def site_status_durations(df):
+    columns, dates = dated_snapshot_columns(df)
+    matrix = StatusMatrix.from_frame(df, columns, dates)
+    codes, labels = matrix.codes, matrix.labels
+
+    seen = first_seen(codes, dates, labels)
+    sites = df[['Region', 'Site Name', 'Technology Type']].reset_index(drop=True)
+    for label in labels:
+        sites[f"First {label}"] = seen[label]
+
+    # Days between the first sighting of consecutive pipeline stages
+    for earlier, later in zip(PIPELINE_STAGES, PIPELINE_STAGES[1:]):
+        if earlier in labels and later in labels:
+            sites[f"Days {earlier} to {later}"] = (seen[later] - seen[earlier]).dt.days
+
+    # Time spent in each status, summed over all of its runs
+    runs = status_runs(codes, dates)
+    dwell = runs.pivot_table(index='Site Position', columns='Status Code', values='Days', aggfunc='sum')
+    for code, label in enumerate(labels):
+        if code in dwell.columns:
+            sites[f"Days in {label}"] = dwell[code].reindex(sites.index)
+
+    sites['First Seen'] = seen.min(axis=1)
+    sites['Last Snapshot'] = dates[-1] if len(dates) else pd.NaT
+    return sites
+
+def kaplan_meier(durations, events, horizons):
+    # Survival estimate (share of projects not yet in service) at each horizon
+    # One step per distinct duration: the events at that duration over the
+    # projects still at risk, including those censored at the same duration
+    total = len(durations)
+    durations, inverse, counts = np.unique(durations, return_inverse=True, return_counts=True)
+    reached = np.bincount(inverse, weights=events, minlength=len(durations))
+    at_risk = total - (np.cumsum(counts) - counts)
+    survival = np.cumprod(1 - reached / at_risk)
+
+    result = {}
+    for horizon in horizons:
+        position = np.searchsorted(durations, horizon, side='right') - 1
+        result[f"Not In Service After {horizon} Days"] = round(float(survival[position]), 3) if position >= 0 else 1.0
+
+    below_half = np.flatnonzero(survival <= 0.5)
+    result['Median Days To In Service'] = float(durations[below_half[0]]) if len(below_half) else np.nan
+    return result
+
+def time_to_commissioning(sites, start_status='Committed', by=('Region', 'Technology Type')):
+    # Survival-style summary of the time from first reaching start_status to
+    # first being seen in service. Projects not yet in service are censored
+    # at the latest snapshot.
+    start = sites.get(f"First {start_status}")
+    if start is None:
+        return pd.DataFrame()
+
+    entered = sites[start.notna()].copy()
+    in_service = entered.get(f"First {IN_SERVICE}", pd.Series(pd.NaT, index=entered.index))
+    reached = in_service.notna() & (in_service >= entered[f"First {start_status}"])
+    end = in_service.where(reached, entered['Last Snapshot'])
+    entered['Duration'] = (end - entered[f"First {start_status}"]).dt.days.astype(float)
+    entered['Reached'] = reached.astype(float)
+
+    rows = []
+    for group, projects in entered.groupby(list(by), dropna=False):
+        row = dict(zip(by, group))
+        row['Projects'] = len(projects)
+        row['Reached In Service'] = int(projects['Reached'].sum())
+        row.update(kaplan_meier(projects['Duration'].to_numpy(), projects['Reached'].to_numpy(), SURVIVAL_HORIZONS))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def main(input_file, output_file):
+    df = pd.read_excel(input_file)
+    sites = site_status_durations(df)
+    summary = time_to_commissioning(sites)
+
+    with pd.ExcelWriter(output_file) as writer:
+        sites.to_excel(writer, sheet_name='Site Durations', index=False)
+        summary.to_excel(writer, sheet_name='Time To Commissioning', index=False)
+
+    print(f"Status durations for {len(sites)} sites saved to '{output_file}'")
+    print(summary.head())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Status dwell times and time-to-commissioning summaries")
+    parser.add_argument('--input', default='extracted_new.xlsx', help="Normalised output of preprocessing.py")
+    parser.add_argument('--output', default='status_durations.xlsx')
+    args = parser.parse_args()
+    main(args.input, args.output)
@@ -0,0 +1,132 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from snapshots import NON_DATE_COLUMNS, dated_snapshot_columns, encode_statuses, snapshot_columns
+
+# Codes fit in an int8 matrix, with -1 for a blank cell
+MAX_STATUS_CODES = 127
+
+class StatusMatrix:
+    # Compact companion to the wide site table: statuses as an int8 site x
+    # snapshot code matrix plus the label for each code, and capacities as a
+    # float32 matrix (NaN where the site has no status in a snapshot)
+    def __init__(self, sites, snapshots, dates, codes, labels, capacities):
+        if len(labels) > MAX_STATUS_CODES:
+            raise ValueError(f"{len(labels)} distinct statuses do not fit in an int8 code matrix")
+        self.sites = sites.reset_index(drop=True)
+        self.snapshots = list(snapshots)
+        self.dates = None if dates is None else pd.DatetimeIndex(dates)
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.labels = list(labels)
+        self.capacities = np.asarray(capacities, dtype=np.float32)
+
+    @classmethod
+    def from_frame(cls, df, columns=None, dates=None):
+        # Normalised tables are ordered by snapshot date; tables whose columns
+        # are not normalised dates (e.g. extracted2.xlsx) keep their order
+        if columns is None:
+            columns, dates = dated_snapshot_columns(df)
+            if not columns:
+                columns, dates = snapshot_columns(df), None
+        codes, labels = encode_statuses(df, columns)
+        capacity = pd.to_numeric(df['Nameplate Capacity'], errors='coerce').to_numpy(dtype=np.float32)
+        capacities = np.where(codes != -1, capacity[:, None], np.nan)
+        sites = df[[column for column in NON_DATE_COLUMNS if column in df.columns]]
+        return cls(sites, columns, dates, codes, labels, capacities)
+
+    @classmethod
+    def from_site_master(cls, db_path):
+        # Per-release statuses and capacities from the site master, in
+        # snapshot date order; snapshots whose name is not a date are left out
+        from lookups import parse_snapshot_date
+        from site_master import SITE_COLUMN_NAMES, SiteMaster
+
+        with SiteMaster(db_path) as site_master:
+            sites = site_master.sites()
+            history = site_master.history()
+
+        snapshots = pd.Series(history['snapshot'].unique())
+        dates = pd.to_datetime(snapshots.map(parse_snapshot_date))
+        snapshots, dates = snapshots[dates.notna()], dates[dates.notna()]
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        snapshots, dates = snapshots.iloc[order].tolist(), dates.iloc[order].to_numpy()
+
+        statuses = history.pivot(index='site_id', columns='snapshot', values='status').reindex(
+            index=sites.index, columns=snapshots)
+        capacities = history.assign(capacity=pd.to_numeric(history['capacity'], errors='coerce')).pivot(
+            index='site_id', columns='snapshot', values='capacity').reindex(index=sites.index, columns=snapshots)
+
+        codes, labels = encode_statuses(statuses, snapshots)
+        sites = sites.rename(columns=SITE_COLUMN_NAMES)[NON_DATE_COLUMNS]
+        return cls(sites, snapshots, dates, codes, labels, capacities.to_numpy(dtype=float))
+
+    def __len__(self):
+        return len(self.sites)
+
+    def code(self, label):
+        return self.labels.index(label)
+
+    def mask(self, label):
+        # site x snapshot boolean matrix of cells with the given status
+        if label not in self.labels:
+            return np.zeros(self.codes.shape, dtype=bool)
+        return self.codes == self.code(label)
+
+    def _column_labels(self):
+        return self.dates if self.dates is not None else pd.Index(self.snapshots)
+
+    def _per_status(self, weights=None):
+        # Sums over sites for every status and snapshot in one bincount
+        statuses, snapshots = len(self.labels), len(self.snapshots)
+        cells = (self.codes.astype(np.int64) + 1) * snapshots + np.arange(snapshots)
+        totals = np.bincount(cells.ravel(), weights=None if weights is None else weights.ravel(),
+                             minlength=(statuses + 1) * snapshots)
+        return pd.DataFrame(totals.reshape(statuses + 1, snapshots)[1:], index=self.labels,
+                            columns=self._column_labels())
+
+    def counts(self):
+        # Number of sites in each status in every snapshot
+        return self._per_status().astype(np.int64)
+
+    def capacity_totals(self):
+        # Capacity in each status in every snapshot
+        return self._per_status(np.nan_to_num(self.capacities.astype(np.float64)))
+
+    def transition_counts(self):
+        # Number of site moves from one status to another between consecutive
+        # snapshots in which the site has a status
+        statuses = len(self.labels)
+        before, after = self.codes[:, :-1].astype(np.int64), self.codes[:, 1:].astype(np.int64)
+        moved = (before != -1) & (after != -1)
+        counts = np.bincount(before[moved] * statuses + after[moved], minlength=statuses * statuses)
+        return pd.DataFrame(counts.reshape(statuses, statuses), index=self.labels, columns=self.labels)
+
+    def transitions(self, from_label, to_label):
+        # site x (snapshot - 1) boolean matrix, True where a site went from
+        # from_label in one snapshot to to_label in the next
+        mask_from, mask_to = self.mask(from_label), self.mask(to_label)
+        return mask_from[:, :-1] & mask_to[:, 1:]
+
+    def to_frame(self):
+        # The labelled wide table: site columns plus one status column per
+        # snapshot, with None where blank
+        label_array = np.array(self.labels + [None], dtype=object)
+        statuses = pd.DataFrame(label_array[self.codes], columns=self.snapshots)
+        return pd.concat([self.sites, statuses], axis=1)
+
+def matrix_path(site_table_path):
+    root, _ = os.path.splitext(site_table_path)
+    return f"{root}_matrix.pkl"
+
+def save_matrix(matrix, site_table_path):
+    output_file = matrix_path(site_table_path)
+    with open(output_file, 'wb') as f:
+        pickle.dump(matrix, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return output_file
+
+def load_matrix(site_table_path):
+    with open(matrix_path(site_table_path), 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,157 @@
+import argparse
+import os
+import time
+
+from checkpoint import CHECKPOINT_FILE, load_checkpoint, save_checkpoint
+from full_automation_algo import empty_combined_frame, file_digest, list_workbook_files, merge_data
+from lookups import ALL_CATEGORIES
+import preprocessing
+
+# As in full_automation_algo, pandas and the extraction modules are imported
+# where they are first needed, so --help does not load them
+
+OUTPUT_FILE = 'extracted2.xlsx'
+
+class FolderWatcher:
+    # Keeps the merged state in memory and in a checkpoint, and merges only
+    # workbooks that are not in the checkpoint's completed list, so the
+    # archive is read once and every later release is an incremental upsert
+    def __init__(self, input_folder, checkpoint_path=CHECKPOINT_FILE, site_master_path=None,
+                 categories=ALL_CATEGORIES, refresh_preprocessing=True):
+        self.input_folder = input_folder
+        self.checkpoint_path = checkpoint_path
+        self.site_master_path = site_master_path
+        self.categories = categories
+        self.refresh_preprocessing = refresh_preprocessing
+
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint:
+            self.combined_df, self.completed = checkpoint
+            print(f"Loaded merged state for {len(self.completed)} workbooks from '{checkpoint_path}'")
+        else:
+            self.combined_df, self.completed = empty_combined_frame(), []
+        self.completed_paths = set(self.completed)
+        self.seen_digests = None
+        self.failed_paths = set()
+        self.pending_sizes = {}
+        # Normalised table from the last refresh, so the next one only
+        # recomputes the capacity cube for snapshots that changed
+        self.normalised_df = None
+        # Set while the outputs lag behind the merged state, e.g. after a
+        # failed refresh, so the next poll retries it
+        self.refresh_pending = False
+
+    def ready_workbooks(self):
+        # A new file is picked up once its size is unchanged between two polls,
+        # so half-copied files are not parsed
+        ready = []
+        for file_path, status_column_name in list_workbook_files(self.input_folder):
+            if (file_path in self.completed_paths or file_path in self.failed_paths
+                    or os.path.basename(file_path).startswith('~$')):
+                continue
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                # Moved or deleted since the folder was listed
+                self.pending_sizes.pop(file_path, None)
+                continue
+            if self.pending_sizes.get(file_path) == size:
+                del self.pending_sizes[file_path]
+                ready.append((file_path, status_column_name))
+            else:
+                self.pending_sizes[file_path] = size
+        return ready
+
+    def is_duplicate(self, file_path):
+        if self.seen_digests is None:
+            # Hash the files merged before this process started only once
+            self.seen_digests = {file_digest(path): path for path in self.completed if os.path.exists(path)}
+        digest = file_digest(file_path)
+        if digest in self.seen_digests:
+            print(f"Skipping {os.path.basename(file_path)}: identical to {os.path.basename(self.seen_digests[digest])}")
+            return True
+        self.seen_digests[digest] = file_path
+        return False
+
+    def ingest(self, workbooks):
+        from extractors import process_file
+        from site_master import SiteMaster
+        from site_records import records_from_frame
+
+        merged = 0
+        site_master = SiteMaster(self.site_master_path) if self.site_master_path else None
+        try:
+            for file_path, status_column_name in workbooks:
+                if not self.is_duplicate(file_path):
+                    try:
+                        processed_data = process_file(file_path, status_column_name, self.categories)
+                        # As in merge_workbooks, a site-master error leaves
+                        # the merged state untouched
+                        if site_master:
+                            site_master.upsert_workbook(processed_data, status_column_name)
+                        if status_column_name not in self.combined_df.columns:
+                            self.combined_df[status_column_name] = ''
+                        self.combined_df = merge_data(self.combined_df, records_from_frame(processed_data, status_column_name),
+                                                      status_column_name)
+                        merged += 1
+                    except Exception as e:
+                        print(f"Error processing file {os.path.basename(file_path)}: {str(e)}")
+                        self.failed_paths.add(file_path)
+                        continue
+                self.completed.append(file_path)
+                self.completed_paths.add(file_path)
+        finally:
+            if site_master:
+                site_master.close()
+
+        save_checkpoint(self.checkpoint_path, self.combined_df, self.completed)
+        return merged
+
+    def refresh_outputs(self):
+        from excel_export import write_excel
+
+        write_excel(self.combined_df, OUTPUT_FILE)
+        print(f"Updated '{OUTPUT_FILE}' ({len(self.combined_df)} sites)")
+        if self.refresh_preprocessing:
+            # In-process, so each refresh reuses the imports of this process
+            self.normalised_df = preprocessing.main(OUTPUT_FILE, preprocessing.OUTPUT_FILE, self.normalised_df)
+
+    def poll(self):
+        workbooks = self.ready_workbooks()
+        merged = 0
+        if workbooks:
+            start = time.perf_counter()
+            merged = self.ingest(workbooks)
+            print(f"Ingested {merged} of {len(workbooks)} new workbooks in {time.perf_counter() - start:.1f} s")
+        if merged or self.refresh_pending:
+            self.refresh_pending = True
+            self.refresh_outputs()
+            self.refresh_pending = False
+        return merged
+
+    def run(self, interval):
+        print(f"Watching '{self.input_folder}' every {interval} s (Ctrl+C to stop)")
+        try:
+            while True:
+                # A failed poll is logged and retried; only Ctrl+C stops the watcher
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Error while polling '{self.input_folder}': {str(e)}")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("Stopped watching")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge new AEMO releases as they land in a folder")
+    parser.add_argument('input_folder', help="Folder containing Excel files and subfolders")
+    parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help="Merged state kept between runs")
+    parser.add_argument('--site-master', help="SQLite site master to upsert new workbooks into")
+    parser.add_argument('--no-preprocessing', action='store_true',
+                        help=f"Only refresh '{OUTPUT_FILE}', not the normalised outputs")
+    args = parser.parse_args()
+
+    watcher = FolderWatcher(args.input_folder, args.checkpoint, args.site_master,
+                            refresh_preprocessing=not args.no_preprocessing)
+    watcher.run(args.interval)